@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from facebook_rental_agent import derive_seed, new_seed
+from post_batch import build_post
+
+
+class AsyncPostGenerator:
+    """Generates LLM posts concurrently with a bounded number of in-flight Ollama requests.
+
+    Themes and campuses for the whole batch are drawn up front with
+    FacebookRentalAgent.generate_posts, which also supplies each slot's template
+    fallback. Prompts are then fanned out to Ollama, at most `concurrency` at a
+    time, each with its own `deadline` in seconds, counted from when its request
+    is sent. A request past its deadline is abandoned by the HTTP client itself,
+    so its slot is only freed once nothing is left running. Results keep the
+    batch order.
+    """
+
+    def __init__(self, agent, concurrency: int = 4, deadline: float = 30.0):
+        self.agent = agent
+        self.concurrency = concurrency
+        self.deadline = deadline
+
+    async def generate_posts(self, n: int, theme: str = None, campus: str = None, seed: int = None,
+                             listing_id: str = None, campus_weights: Dict[str, float] = None,
+                             on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                             cancel: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """Generate n posts concurrently, in order; `on_result` and `cancel` work as in fill_slots."""
+        slots = self.agent.generate_posts(n, theme=theme, campus=campus, seed=seed, listing_id=listing_id,
+                                          campus_weights=campus_weights)
+        return await self.fill_slots(slots, on_result, cancel)
+
+    async def fill_slots(self, slots: Iterable[Dict[str, Any]],
+                         on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                         cancel: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """Have the LLM write each planned slot, keeping the slot itself as its fallback.
+
+        `on_result(index, post)` is called as each post finishes, in completion
+        order. Once `cancel` is set, slots not yet sent to Ollama keep their
+        template post. Each slot's sampling seed is derived from its seed and its
+        position in the batch.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # requests is blocking, so each in-flight call gets a worker thread
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return await asyncio.gather(*(
+                self._generate_one(i, slot, semaphore, executor, on_result, cancel)
+                for i, slot in enumerate(slots)
+            ))
+
+    async def _generate_one(self, index: int, slot: Dict[str, Any], semaphore: asyncio.Semaphore,
+                            executor: ThreadPoolExecutor, on_result=None, cancel=None) -> Dict[str, Any]:
+        seed = slot["seed"]
+        llm_seed = new_seed() if seed is None else derive_seed(seed, f"slot:{index}")
+        post = await self._write(slot, semaphore, executor, cancel, llm_seed)
+        if on_result is not None:
+            on_result(index, post)
+        return post
+
+    async def _write(self, slot: Dict[str, Any], semaphore: asyncio.Semaphore,
+                     executor: ThreadPoolExecutor, cancel: Optional[threading.Event],
+                     llm_seed: int) -> Dict[str, Any]:
+        agent = self.agent
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            if cancel is not None and cancel.is_set():
+                return slot
+            # _llm_text checks the response cache and the text, enforces the deadline
+            # and reports its own errors; the slot is held until its thread is done
+            text, model = await loop.run_in_executor(executor, agent._llm_text, slot["theme"],
+                                                     slot["target_campus"], slot["listing_id"], True,
+                                                     llm_seed, self.deadline)
+        if not text:
+            # Fall back to the template post drawn for this slot
+            return slot
+        return build_post(slot["date"], slot["theme"], slot["target_campus"], text,
+                          model, slot["seed"], slot["listing_id"])
+
+    def run(self, n: int, theme: str = None, campus: str = None, seed: int = None,
+            listing_id: str = None, campus_weights: Dict[str, float] = None,
+            on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+            cancel: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """Blocking wrapper around generate_posts for callers without an event loop."""
+        return asyncio.run(self.generate_posts(n, theme=theme, campus=campus, seed=seed, listing_id=listing_id,
+                                               campus_weights=campus_weights, on_result=on_result, cancel=cancel))
+
+    def run_slots(self, slots: Iterable[Dict[str, Any]],
+                  on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                  cancel: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """Blocking wrapper around fill_slots."""
+        return asyncio.run(self.fill_slots(slots, on_result, cancel))
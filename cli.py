@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Facebook Rental Agent command line interface for cron jobs and pipelines
+
+Examples:
+    python cli.py generate 20 --theme affordability --seed 42 --format csv -o posts.csv
+    python cli.py plan --days 7 --save
+    python cli.py export --since 2025-09-01 --format jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from facebook_rental_agent import CAMPUSES, FacebookRentalAgent
+from post_batch import POST_FIELDS, as_dict
+
+FORMATS = ["jsonl", "csv"]
+
+
+class PostWriter:
+    """Writes posts as JSON lines or CSV rows, flushing after each one so readers see them at once."""
+
+    def __init__(self, stream: TextIO, fmt: str = "jsonl"):
+        self.stream = stream
+        self.fmt = fmt
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(stream, fieldnames=POST_FIELDS, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, post: Dict[str, Any]):
+        if self._csv is not None:
+            self._csv.writerow(post)
+        else:
+            self.stream.write(json.dumps(as_dict(post), ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def campus_weights_arg(value: str) -> Dict[str, float]:
+    """Parse --campus-weights, e.g. UCSB=0.5,SBCC=0.5."""
+    try:
+        weights = {campus.strip(): float(weight) for campus, weight in
+                   (part.split("=") for part in value.split(","))}
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected CAMPUS=WEIGHT pairs, e.g. UCSB=0.5,SBCC=0.5")
+    unknown = set(weights) - set(CAMPUSES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown campus: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def log(message: str):
+    """Progress and errors go to stderr so stdout stays machine-readable."""
+    print(message, file=sys.stderr)
+
+
+def _llm_posts(agent: FacebookRentalAgent, slots: List[Dict[str, Any]], concurrency: int) -> Iterable[Dict[str, Any]]:
+    """Have the LLM fill the slots, `concurrency` requests at a time, yielding posts in order as they are ready.
+
+    The whole batch runs in one background fill, so a slow post only holds back
+    the output after it, not the requests. If the reader stops early, no new
+    requests are sent.
+    """
+    from async_generation import AsyncPostGenerator
+    generator = AsyncPostGenerator(agent, concurrency=concurrency)
+    finished: "queue.Queue[Optional[Tuple[int, Dict[str, Any]]]]" = queue.Queue()
+    cancel = threading.Event()
+    errors = []
+
+    def fill():
+        try:
+            generator.run_slots(slots, on_result=lambda index, post: finished.put((index, post)), cancel=cancel)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            finished.put(None)
+
+    worker = threading.Thread(target=fill, name="rental-agent-llm", daemon=True)
+    worker.start()
+    # Posts that finished ahead of an earlier one wait here until it is written
+    ready = {}
+    next_index = 0
+    try:
+        while next_index < len(slots):
+            item = finished.get()
+            if item is None:
+                break
+            ready[item[0]] = item[1]
+            while next_index in ready:
+                yield ready.pop(next_index)
+                next_index += 1
+    finally:
+        cancel.set()
+        worker.join()
+    if errors:
+        raise errors[0]
+
+
+def _emit(args, agent: FacebookRentalAgent, posts: Iterable[Dict[str, Any]]) -> int:
+    """Write posts to the output, saving them to the post store too with --save."""
+    saved = []
+    out = args.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        writer = PostWriter(out, args.format)
+        for post in posts:
+            writer.write(post)
+            if args.save:
+                saved.append(post)
+    finally:
+        if out is not args.stdout:
+            out.close()
+    if saved:
+        agent.save_posts(saved)
+        log(f"Saved {len(saved)} posts to {agent.store.path}")
+    return 0
+
+
+def cmd_generate(args, agent: FacebookRentalAgent) -> int:
+    listing_id = args.listing or None
+    if args.llm:
+        slots = agent.generate_posts(args.count, theme=args.theme, campus=args.campus, seed=args.seed,
+                                     listing_id=listing_id, campus_weights=args.campus_weights).to_dicts()
+        posts = _llm_posts(agent, slots, args.concurrency)
+    else:
+        posts = agent.generate_posts(args.count, theme=args.theme, campus=args.campus, seed=args.seed,
+                                     listing_id=listing_id, campus_weights=args.campus_weights)
+    return _emit(args, agent, posts)
+
+
+def cmd_plan(args, agent: FacebookRentalAgent) -> int:
+    start_date = datetime.strptime(args.start, "%Y-%m-%d") if args.start else None
+    if args.all_listings:
+        listing_ids = agent.registry.ids()
+    else:
+        listing_ids = [args.listing] if args.listing else None
+    posts = agent.plan_posts(args.days, start_date=start_date, seed=args.seed,
+                             listing_ids=listing_ids, campus=args.campus, campus_weights=args.campus_weights)
+    if args.llm:
+        posts = _llm_posts(agent, posts, args.concurrency)
+    if not args.keep_duplicates:
+        posts = agent.avoid_near_duplicates(posts)
+    return _emit(args, agent, posts)
+
+
+def cmd_export(args, agent: FacebookRentalAgent) -> int:
+    posts = agent.store.query(start_date=args.since, end_date=args.until, theme=args.theme,
+                              campus=args.campus, limit=args.limit)
+    args.save = False
+    return _emit(args, agent, posts)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate Isla Vista rental posts without the menu or web UI.")
+    parser.add_argument("--model", default="tinyllama:latest", help="Ollama model for --llm (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--format", choices=FORMATS, default="jsonl", help="output format (default: jsonl)")
+    output.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+
+    generating = argparse.ArgumentParser(add_help=False)
+    generating.add_argument("--campus", choices=CAMPUSES, help="target campus (default: 70/30 UCSB/SBCC)")
+    generating.add_argument("--campus-weights", type=campus_weights_arg, metavar="CAMPUS=WEIGHT,...",
+                            help="campus mix when --campus is not given, e.g. UCSB=0.5,SBCC=0.5")
+    generating.add_argument("--seed", type=int, help="seed for reproducible output")
+    generating.add_argument("--listing", help="listing id (default: the first listing)")
+    generating.add_argument("--llm", action="store_true", help="have Ollama write the posts; templates otherwise")
+    generating.add_argument("--concurrency", type=int, default=4, help="parallel Ollama requests with --llm")
+    generating.add_argument("--save", action="store_true", help="also append the posts to the post store")
+
+    generate = subparsers.add_parser("generate", parents=[output, generating], help="generate N posts")
+    generate.add_argument("count", type=int, help="number of posts")
+    generate.add_argument("--theme", help="post theme (default: random)")
+    generate.set_defaults(func=cmd_generate)
+
+    plan = subparsers.add_parser("plan", parents=[output, generating],
+                                 help="plan one post per day per listing (a week by default)")
+    plan.add_argument("--days", type=int, default=7, help="days to plan (default: 7)")
+    plan.add_argument("--start", help="first day, YYYY-MM-DD (default: today)")
+    plan.add_argument("--all-listings", action="store_true", help="plan every listing in the registry")
+    plan.add_argument("--keep-duplicates", action="store_true",
+                      help="don't redraw posts that nearly repeat saved posts or each other")
+    plan.set_defaults(func=cmd_plan)
+
+    export = subparsers.add_parser("export", parents=[output], help="export saved posts from the post store")
+    export.add_argument("--since", help="first date, YYYY-MM-DD")
+    export.add_argument("--until", help="last date, YYYY-MM-DD")
+    export.add_argument("--theme", help="only this theme")
+    export.add_argument("--campus", choices=CAMPUSES, help="only this campus")
+    export.add_argument("--limit", type=int, help="at most this many posts")
+    export.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    args.stdout = sys.stdout
+    try:
+        # The agent prints its own status and errors; keep them out of the data on stdout
+        with redirect_stdout(sys.stderr):
+            agent = FacebookRentalAgent(model_name=args.model)
+            return args.func(args, agent)
+    except (KeyError, ValueError) as e:
+        log(f"Error: {e.args[0] if e.args else e}")
+        return 2
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); don't fail flushing stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
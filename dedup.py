@@ -0,0 +1,142 @@
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+FINGERPRINT_BITS = 64
+_COUNTER_BITS = 16
+
+# _SPREAD[b] moves bit i of byte b into its own 16-bit counter field, so that summing
+# spread hashes counts the set bits of every position at once
+_SPREAD = [sum(((b >> i) & 1) << (i * _COUNTER_BITS) for i in range(8)) for b in range(256)]
+
+
+@lru_cache(maxsize=65536)
+def _shingle_counts(shingle: str) -> int:
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=FINGERPRINT_BITS // 8).digest()
+    counts = 0
+    for j, byte in enumerate(digest):
+        counts |= _SPREAD[byte] << (j * 8 * _COUNTER_BITS)
+    return counts
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash of the text's word shingles; similar texts differ in few bits."""
+    words = text.lower().split()
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    totals = sum(_shingle_counts(shingle) for shingle in shingles)
+    counts = struct.unpack(f"<{FINGERPRINT_BITS}H", totals.to_bytes(FINGERPRINT_BITS * 2, "little"))
+    # A bit is set when most shingles have it set
+    return sum(1 << i for i, count in enumerate(counts) if 2 * count > len(shingles))
+
+
+try:
+    _popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return _popcount(a ^ b)
+
+
+class NearDuplicateIndex:
+    """Index of recent post fingerprints for fast near-duplicate checks.
+
+    Two posts are near-duplicates when their SimHash fingerprints differ in at most
+    `max_distance` bits. Fingerprints are split into `max_distance + 1` bands, so
+    by the pigeonhole principle any near-duplicate matches at least one band
+    exactly. A lookup therefore only compares against the posts in its band
+    buckets. Only the `window` most recent posts are kept (all of them if
+    `window` is None); posts added with a date can also be dropped by age with
+    forget_before. The index is safe to share between threads.
+    """
+
+    def __init__(self, max_distance: int = 8, window: Optional[int] = 365, shingle_size: int = 3):
+        self.max_distance = max_distance
+        self.window = window
+        self.shingle_size = shingle_size
+        self._bands = self._make_bands(max_distance + 1)
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in self._bands]
+        self._entries: "OrderedDict[int, int]" = OrderedDict()
+        self._dates: Dict[int, str] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_bands(count: int) -> List[Tuple[int, int]]:
+        """(shift, mask) pairs splitting the fingerprint into `count` near-equal bands."""
+        bands = []
+        shift = 0
+        for i in range(count):
+            width = FINGERPRINT_BITS // count + (1 if i < FINGERPRINT_BITS % count else 0)
+            bands.append((shift, (1 << width) - 1))
+            shift += width
+        return bands
+
+    def fingerprint(self, text: str) -> int:
+        return simhash(text, self.shingle_size)
+
+    def add(self, text: str, date: Optional[str] = None) -> int:
+        """Remember a post, evicting the oldest beyond the window; returns its fingerprint.
+
+        `date` (YYYY-MM-DD) is the post's date, for forget_before.
+        """
+        fingerprint = self.fingerprint(text)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = fingerprint
+            if date is not None:
+                self._dates[entry_id] = date
+            for (shift, mask), buckets in zip(self._bands, self._buckets):
+                buckets.setdefault((fingerprint >> shift) & mask, set()).add(entry_id)
+
+            while self.window is not None and len(self._entries) > self.window:
+                self._remove(next(iter(self._entries)))
+        return fingerprint
+
+    def forget_before(self, date: str):
+        """Drop posts dated before `date` (YYYY-MM-DD); posts added without a date are kept."""
+        with self._lock:
+            for entry_id in [entry_id for entry_id, posted in self._dates.items() if posted < date]:
+                self._remove(entry_id)
+
+    def _remove(self, entry_id: int):
+        fingerprint = self._entries.pop(entry_id)
+        self._dates.pop(entry_id, None)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            key = (fingerprint >> shift) & mask
+            bucket = buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del buckets[key]
+
+    def _candidates(self, fingerprint: int) -> Set[int]:
+        candidates = set()
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            candidates.update(buckets.get((fingerprint >> shift) & mask, ()))
+        return candidates
+
+    def nearest_distance(self, text: str) -> Optional[int]:
+        """Bit distance to the closest indexed near-duplicate, or None if there is none."""
+        fingerprint = self.fingerprint(text)
+        entries = self._entries
+        with self._lock:
+            best = min((_popcount(fingerprint ^ entries[entry_id]) for entry_id in self._candidates(fingerprint)),
+                       default=None)
+        return best if best is not None and best <= self.max_distance else None
+
+    def is_near_duplicate(self, text: str) -> bool:
+        """Whether any indexed post is within max_distance bits; stops at the first match."""
+        fingerprint = self.fingerprint(text)
+        entries = self._entries
+        with self._lock:
+            return any(_popcount(fingerprint ^ entries[entry_id]) <= self.max_distance
+                       for entry_id in self._candidates(fingerprint))
+
+    def __len__(self) -> int:
+        return len(self._entries)
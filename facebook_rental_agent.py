@@ -1,68 +1,130 @@
 import os
+import copy
 import json
 import random
-import requests
+import hashlib
+import math
+import threading
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from dotenv import load_dotenv
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+from dedup import NearDuplicateIndex
+from listing_registry import DEFAULT_LISTINGS_PATH, ListingRegistry
+from llm_cache import ResponseCache
+from metrics import Metrics, metrics_from_env
+from model_router import ModelRouter
+from ollama_client import OllamaClient, OllamaError
+from post_batch import PostBatch, as_dict, build_post
+from post_store import PostStore
+from post_stream import PostStream
+from post_pipeline import PostValidator, clean_stream
+from post_render import facebook_text, label, preview_text
+from prompt_builder import DEFAULT_PROMPT_BUDGET, PromptBuilder
+from scheduler import PostScheduler
+from template_engine import ObservedDict, TemplateEngine
+
+_env_loaded = False
+
+# Prioritize UCSB students (70% chance), SBCC secondary (30% chance)
+CAMPUSES = ["UCSB", "SBCC"]
+CAMPUS_WEIGHTS = [0.7, 0.3]
+
+# How far back saved posts count when checking new ones for near-repeats
+DEDUP_HISTORY_DAYS = 365
+
+
+def load_env():
+    """Load environment variables from .env, once, when the first agent is created."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def campus_weight_list(campus_weights: Optional[Dict[str, float]] = None) -> List[float]:
+    """Draw weights parallel to CAMPUSES from a campus -> weight mapping.
+
+    None gives the default 70/30 split. Campuses missing from the mapping get no
+    posts.
+    """
+    if campus_weights is None:
+        return CAMPUS_WEIGHTS
+    unknown = set(campus_weights) - set(CAMPUSES)
+    if unknown:
+        raise ValueError(f"Unknown campus: {', '.join(sorted(unknown))}")
+    weights = [float(campus_weights.get(campus, 0)) for campus in CAMPUSES]
+    if any(weight < 0 for weight in weights) or sum(weights) <= 0:
+        raise ValueError("Campus weights must be non-negative and add up to more than zero")
+    return weights
+
+
+def _size_bucket(n: int) -> str:
+    """Coarse batch-size label, so batch timings stay comparable without a label per size."""
+    for bound in (10, 100, 1000, 10000):
+        if n <= bound:
+            return f"<={bound}"
+    return ">10000"
+
+
+def new_seed() -> int:
+    """A fresh seed for a post or batch, drawn from the global random state."""
+    return random.getrandbits(32)
+
+
+def derive_seed(seed: int, index: Union[int, str]) -> int:
+    """Independent seed for shard `index` of a seeded job (e.g. one per worker process).
+
+    Streams for different purposes use their own namespace in `index`, such as
+    "dedup" or "slot:3", so they never share a seed with a numbered shard.
+    """
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:4], "big")
 
-# Load environment variables
-load_dotenv()
 
 class FacebookRentalAgent:
-    def __init__(self, model_name: str = "tinyllama:latest"):
-        """Initialize the Facebook Rental Agent for Isla Vista apartment posts using Ollama."""
-        self.ollama_url = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+    def __init__(self, model_name: str = "tinyllama:latest", ollama: OllamaClient = None,
+                 cache: ResponseCache = None, registry: ListingRegistry = None, listing_id: str = None,
+                 metrics: Metrics = None):
+        """Initialize the Facebook Rental Agent for Isla Vista apartment posts using Ollama.
+
+        Nothing here contacts Ollama; the server is first probed when the model list
+        or an LLM post is needed. Metrics are off unless `metrics` is given or
+        AGENT_METRICS is set (see metrics_from_env).
+        """
+        load_env()
+        self.metrics = metrics or metrics_from_env()
+        # Keep the model loaded between posts so the shared prompt prefix stays warm
+        self.ollama = ollama or OllamaClient(os.getenv('OLLAMA_URL', 'http://localhost:11434'),
+                                             keep_alive=os.getenv('OLLAMA_KEEP_ALIVE', '30m'))
+        self.ollama_url = self.ollama.base_url
+        # Responses are cached in memory, and on disk too if OLLAMA_CACHE_PATH is set
+        self.cache = cache or ResponseCache(path=os.getenv('OLLAMA_CACHE_PATH'))
         self.model_name = model_name
-        self.apartment_details = {
-            "location": "Isla Vista, CA",
-            "address": "6777 Del Playa Dr, Isla Vista, CA 93117",
-            "bedrooms": 4,
-            "bathrooms": 2,
-            "sqft": "1,493",
-            "room_availability": {
-                "triple_room": "1 available immediately",
-                "double_room": "1 available immediately"
-            },
-            "pricing": {
-                "rent": "$1,500",
-                "deposit": "$1,500",
-                "first_month": "$1,500",
-                "last_month": "$1,500",
-                "total_due_at_signing": "$4,500"
-            },
-            "target_audience": ["UCSB students", "SBCC students"],
-            "features": [
-                "Walking distance to UCSB campus",
-                "Close to SBCC",
-                "Beachfront location",
-                "Great location on the beach",
-                "Shared back patio with sea views",
-                "High-end stainless steel appliances",
-                "On-site laundry facilities",
-                "Proximity to local park",
-                "Secure 5-unit complex",
-                "Elegant coastal living",
-                "Virtual tour available"
-            ],
-            "amenities": [
-                "Utilities included",
-                "WiFi included",
-                "Furnished",
-                "Beach access",
-                "Walking distance to UCSB and SBCC",
-                "Washer/Dryer in unit",
-                "Dishwasher",
-                "Balcony with ocean view"
-            ],
-            "posting_frequency": "daily",
-            "tone": "friendly, professional, student-focused",
-            "contact": {
-                "phone": "(805) 555-0123",
-                "email": "leasing@playalifeiv.com",
-                "virtual_tour": "https://playalifeiv.com/virtual-tour"
-            }
+        self.prompts = PromptBuilder(int(os.getenv('PROMPT_TOKEN_BUDGET', DEFAULT_PROMPT_BUDGET)))
+        self.generation_options = {
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "max_tokens": 150,
+            "num_predict": 100,
+            # Just enough context for the prompt budget plus the reply
+            "num_ctx": 256 * math.ceil((self.prompts.budget + 100) / 256)
         }
+        # LLM requests go to the first of OLLAMA_MODELS (best first, default just
+        # model_name) that is installed and within LLM_P95_TARGET seconds at p95
+        models = [name.strip() for name in os.getenv('OLLAMA_MODELS', '').split(',') if name.strip()]
+        self.router = ModelRouter(self.ollama, models or [model_name], self.list_available_models,
+                                  p95_target=float(os.getenv('LLM_P95_TARGET', '10')))
+        self._store = None
+        self._models = None  # installed Ollama models, None until probed
+        self._dedup_index = None
+        self._dedup_records = 0  # post store records already in the dedup index
+        self._dedup_lock = threading.Lock()  # serialises dedup index refreshes between threads
+        self._templates = None
+        self._validators = {}  # listing id -> (details, PostValidator)
+        # Rejected LLM posts are asked for again this many times before using a template
+        self.llm_resamples = int(os.getenv('LLM_RESAMPLES', '1'))
         
         # Post templates and themes
         self.post_themes = [
@@ -74,253 +136,718 @@ class FacebookRentalAgent:
             "move_in_ready",
             "neighborhood_highlights"
         ]
+        self.scheduler = PostScheduler(self.post_themes, CAMPUSES, CAMPUS_WEIGHTS)
         
         self.post_templates = {
             "campus_proximity": [
-                "{address} – {campus} Students Welcome!\nSlide through to tour this prime location gem {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nGreat location on the beach, walk to {campus}\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "{campus} STUDENTS! Your dream apartment is here!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nWalking distance to {campus} campus\nGreat location on the beach\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Roll out of bed and walk to {campus}!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nNo more long commutes - everything is walkable!\nGreat location on the beach\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "{campus} LIFE just got better!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nSteps away from campus + beach vibes = perfect student life!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "{campus} STUDENTS: Your perfect spot is here!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nPrime location: Beach + {campus} walking distance\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+                "{address} – {campus} Students Welcome!\nSlide through to tour this prime location gem {bedrooms} bed / {bathrooms} bath\n{rooms}!\nGreat location on the beach, walk to {campus}\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} STUDENTS! Your dream apartment is here!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nWalking distance to {campus} campus\nGreat location on the beach\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Roll out of bed and walk to {campus}!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nNo more long commutes - everything is walkable!\nGreat location on the beach\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} LIFE just got better!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nSteps away from campus + beach vibes = perfect student life!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} STUDENTS: Your perfect spot is here!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPrime location: Beach + {campus} walking distance\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+            ],
+            "beach_lifestyle": [
+                "{address} – Oceanfront Unit Available!\nSlide through to tour this oceanfront gem {bedrooms} bed / {bathrooms} bath\n{rooms}!\nGreat location on the beach with stunning sea views\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "OCEANFRONT LIVING for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nWake up to ocean views every day!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Surf, study, repeat at {address}!\n{bedrooms} bed / {bathrooms} bath oceanfront unit\n{rooms}!\nBeach access + {campus} proximity = student paradise!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Beach vibes meet {campus} life!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPerfect for students who want the ultimate coastal experience!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Sunset views from your {campus} apartment!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nOceanfront living with easy campus access!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+            ],
+            "student_community": [
+                "{address} – Student Community Living!\nSlide through to tour this student-friendly gem {bedrooms} bed / {bathrooms} bath\n{rooms}!\nJoin the {campus} community in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Join the {campus} community at {address}!\n{bedrooms} bed / {bathrooms} bath\n{rooms}!\nConnect with fellow students in this vibrant beach community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} STUDENT LIFE at its finest!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nJoin the best student community in Isla Vista!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} FRIENDSHIP starts here!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nBuild lasting connections in this student-friendly beach community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} COMMUNITY VIBES!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nExperience the best of student life in this beachfront community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+            ],
+            "affordability": [
+                "{address} – Affordable Student Housing!\nSlide through to tour this budget-friendly gem {bedrooms} bed / {bathrooms} bath\n{rooms}!\nStudent-friendly pricing in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "BUDGET-FRIENDLY {campus} living!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nQuality housing that won't break the bank!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Perfect balance: Location + Affordability!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nGreat value for {campus} students in prime beach location!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Student budget approved! {address}\n{bedrooms} bed / {bathrooms} bath\n{rooms}!\nAffordable luxury for {campus} students!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Best value for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPremium location at student-friendly prices!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+            ],
+            "convenience": [
+                "{address} – Convenient Student Living!\nSlide through to tour this convenient location gem {bedrooms} bed / {bathrooms} bath\n{rooms}!\nEverything within walking distance, great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Everything within walking distance!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\n{campus}, beach, shops, food - all nearby!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Convenience meets {campus} life!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nWalk to everything you need!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "No car needed! Everything is walkable!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\n{campus}, beach, restaurants, shopping - all steps away!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Ultimate convenience for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nLocation that makes student life easy!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+            ],
+            "move_in_ready": [
+                "{address} – Move-In Ready!\nSlide through to tour this ready-to-go gem {bedrooms} bed / {bathrooms} bath\n{rooms}!\nAvailable now in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Move-in ready for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nNo waiting - your new home is ready now!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Ready for immediate move-in!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPerfect for {campus} students who need housing now!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Available immediately for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nNo delays - move in when you're ready!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Instant availability for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nYour new home is waiting for you!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+            ],
+            "neighborhood_highlights": [
+                "{address} – Isla Vista Living!\nSlide through to tour this IV gem {bedrooms} bed / {bathrooms} bath\n{rooms}!\nHeart of student life in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Experience the best of Isla Vista!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nThe ultimate {campus} student experience!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "IV LIFE at its finest!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPrime location in the heart of student life!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Premium Isla Vista location!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nThe best spot for {campus} students in IV!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "IV living redefined for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nExperience the magic of Isla Vista!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+            ]
+        }
+        
+        # Fallback templates, used for variety alongside the main templates
+        self.fallback_templates = {
+            "campus_proximity": [
+                "{campus} students! Your perfect spot is here!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nWalking distance to {campus} campus\nGreat location on the beach\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Roll out of bed and walk to {campus}!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nNo more long commutes - everything is walkable!\nGreat location on the beach\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} LIFE just got better!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nSteps away from campus + beach vibes = perfect student life!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
             ],
             "beach_lifestyle": [
-                "{address} – Oceanfront Unit Available!\nSlide through to tour this oceanfront gem {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nGreat location on the beach with stunning sea views\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "OCEANFRONT LIVING for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nWake up to ocean views every day!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Surf, study, repeat at {address}!\n{bedrooms} bed / {bathrooms} bath oceanfront unit\n1 Triple room OR 1 Double room available immediately!\nBeach access + {campus} proximity = student paradise!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Beach vibes meet {campus} life!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nPerfect for students who want the ultimate coastal experience!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Sunset views from your {campus} apartment!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nOceanfront living with easy campus access!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+                "OCEANFRONT LIVING for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nWake up to ocean views every day!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Surf, study, repeat at {address}!\n{bedrooms} bed / {bathrooms} bath oceanfront unit\n{rooms}!\nBeach access + {campus} proximity = student paradise!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Beach vibes meet {campus} life!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPerfect for students who want the ultimate coastal experience!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
             ],
             "student_community": [
-                "{address} – Student Community Living!\nSlide through to tour this student-friendly gem {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nJoin the {campus} community in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Join the {campus} community at {address}!\n{bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nConnect with fellow students in this vibrant beach community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "{campus} STUDENT LIFE at its finest!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nJoin the best student community in Isla Vista!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "{campus} FRIENDSHIP starts here!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nBuild lasting connections in this student-friendly beach community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "{campus} COMMUNITY VIBES!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nExperience the best of student life in this beachfront community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+                "Join the {campus} community at {address}!\n{bedrooms} bed / {bathrooms} bath\n{rooms}!\nConnect with fellow students in this vibrant beach community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} STUDENT LIFE at its finest!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nJoin the best student community in Isla Vista!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "{campus} FRIENDSHIP starts here!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nBuild lasting connections in this student-friendly beach community!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
             ],
             "affordability": [
-                "{address} – Affordable Student Housing!\nSlide through to tour this budget-friendly gem {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nStudent-friendly pricing in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "BUDGET-FRIENDLY {campus} living!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nQuality housing that won't break the bank!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Perfect balance: Location + Affordability!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nGreat value for {campus} students in prime beach location!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Student budget approved! {address}\n{bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nAffordable luxury for {campus} students!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Best value for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nPremium location at student-friendly prices!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+                "BUDGET-FRIENDLY {campus} living!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nQuality housing that won't break the bank!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Perfect balance: Location + Affordability!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nGreat value for {campus} students in prime beach location!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Student budget approved! {address}\n{bedrooms} bed / {bathrooms} bath\n{rooms}!\nAffordable luxury for {campus} students!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
             ],
             "convenience": [
-                "{address} – Convenient Student Living!\nSlide through to tour this convenient location gem {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nEverything within walking distance, great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Everything within walking distance!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\n{campus}, beach, shops, food - all nearby!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Convenience meets {campus} life!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nWalk to everything you need!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "No car needed! Everything is walkable!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\n{campus}, beach, restaurants, shopping - all steps away!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Ultimate convenience for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nLocation that makes student life easy!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+                "Everything within walking distance!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\n{campus}, beach, shops, food - all nearby!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Convenience meets {campus} life!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nWalk to everything you need!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "No car needed! Everything is walkable!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\n{campus}, beach, restaurants, shopping - all steps away!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
             ],
             "move_in_ready": [
-                "{address} – Move-In Ready!\nSlide through to tour this ready-to-go gem {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nAvailable now in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Move-in ready for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nNo waiting - your new home is ready now!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Ready for immediate move-in!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nPerfect for {campus} students who need housing now!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Available immediately for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nNo delays - move in when you're ready!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Instant availability for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nYour new home is waiting for you!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+                "Move-in ready for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nNo waiting - your new home is ready now!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Ready for immediate move-in!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPerfect for {campus} students who need housing now!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Available immediately for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nNo delays - move in when you're ready!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
             ],
             "neighborhood_highlights": [
-                "{address} – Isla Vista Living!\nSlide through to tour this IV gem {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nHeart of student life in great beach location\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Experience the best of Isla Vista!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nThe ultimate {campus} student experience!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "IV LIFE at its finest!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nPrime location in the heart of student life!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "Premium Isla Vista location!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nThe best spot for {campus} students in IV!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
-                "IV living redefined for {campus} students!\n{address} - {bedrooms} bed / {bathrooms} bath\n1 Triple room OR 1 Double room available immediately!\nExperience the magic of Isla Vista!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
+                "Experience the best of Isla Vista!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nThe ultimate {campus} student experience!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "IV LIFE at its finest!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nPrime location in the heart of student life!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!",
+                "Premium Isla Vista location!\n{address} - {bedrooms} bed / {bathrooms} bath\n{rooms}!\nThe best spot for {campus} students in IV!\nRent: {rent}/month\nDue at signing: {deposit} deposit + {first_month} first month + {last_month} last month = {total_due_at_signing} total\nVirtual tour: {virtual_tour}\nDM to apply or set up a tour!"
             ]
         }
+        
+        # Listings live in a data file (LISTINGS_PATH, default listings.json); this
+        # agent's own listing is an editable copy of one of them
+        self.registry = registry or ListingRegistry.load(
+            os.getenv('LISTINGS_PATH', DEFAULT_LISTINGS_PATH), self.post_templates, self.fallback_templates
+        )
+        self.listing_id = listing_id or self.registry.default_id
+        self.apartment_details = copy.deepcopy(self.registry.get(self.listing_id))
+        
+        # Templates are compiled lazily and recompiled when apartment_details changes
+        self._templates = TemplateEngine(self.post_templates, self.fallback_templates, self.apartment_details)
+
+    @property
+    def apartment_details(self) -> Dict[str, Any]:
+        return self._apartment_details
+
+    @apartment_details.setter
+    def apartment_details(self, details: Dict[str, Any]):
+        self._apartment_details = ObservedDict(details, self.invalidate_templates)
+        if self._templates is not None:
+            self._templates.apartment_details = self._apartment_details
+        self.invalidate_templates()
+
+    def invalidate_templates(self):
+        """Force the post templates to be recompiled on the next generation."""
+        self._validators.clear()
+        if self._templates is not None:
+            self._templates.invalidate()
+
+    def _listing(self, listing_id: Optional[str]) -> Dict[str, Any]:
+        """Apartment details for a listing; None means this agent's own listing."""
+        if listing_id is None or listing_id == self.listing_id:
+            return self.apartment_details
+        return self.registry.get(listing_id)
+
+    def _engine(self, listing_id: Optional[str]) -> TemplateEngine:
+        """Compiled templates for a listing; None means this agent's own listing."""
+        if listing_id is None or listing_id == self.listing_id:
+            return self._templates
+        return self.registry.engine(listing_id)
+
+    def _llm_options(self, seed: Optional[int]) -> Dict[str, Any]:
+        """Generation options for one request; a seed makes Ollama's sampling repeatable."""
+        if seed is None:
+            return self.generation_options
+        return {**self.generation_options, "seed": seed}
 
-    def _call_ollama(self, prompt: str) -> str:
-        """Make a call to Ollama API."""
+    def _call_ollama(self, prompt: str, use_cache: bool = True, model: str = None, seed: int = None,
+                     deadline: float = None) -> str:
+        """Make a call to Ollama API, reusing a cached response for identical requests.
+
+        With `use_cache` False, Ollama is always asked, and its answer replaces the
+        cached one. `model` defaults to model_name; the time Ollama takes is
+        recorded with the router. `seed` is sent to Ollama and is part of the cache
+        key, so only a request repeating the same seed gets the cached answer.
+        `deadline` (a time.monotonic() value) is when Ollama must have answered.
+        """
+        model = model or self.model_name
+        metrics = self.metrics
+        options = self._llm_options(seed)
+        key = self.cache.make_key(model, prompt, options)
+        cached = self.cache.get(key) if use_cache else None
+        if cached is not None:
+            metrics.count("llm_cache", result="hit")
+            return cached
+        metrics.count("llm_cache", result="miss")
+        started = time.perf_counter()
         try:
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "max_tokens": 150,
-                        "num_predict": 100
-                    }
-                },
-                timeout=15  # Much shorter timeout for small model
-            )
-            
-            if response.status_code == 200:
-                return response.json().get('response', '').strip()
-            else:
-                print(f"Ollama API error: {response.status_code}")
-                return ""
-                
-        except requests.exceptions.RequestException as e:
+            response = self.ollama.generate(model, prompt, options, deadline)
+        except OllamaError as e:
+            metrics.count("ollama_errors", error=type(e).__name__)
             print(f"Error calling Ollama: {e}")
             return ""
+        finally:
+            elapsed = time.perf_counter() - started
+            self.router.record(model, elapsed)
+            metrics.observe("ollama_call", elapsed, model=model)
+        if response:
+            self.cache.set(key, response)
+        return response
 
-    def _check_ollama_connection(self) -> bool:
-        """Check if Ollama is running and accessible."""
-        try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+    def _check_ollama_connection(self, refresh: bool = False) -> bool:
+        """Check if Ollama is running and accessible, probing it at most once unless `refresh`."""
+        self.list_available_models(refresh)
+        return self._models is not None
+
+    def _build_prompt(self, theme: str, campus: str, listing_id: str = None) -> str:
+        """Build the LLM prompt for a post with the given theme and campus (see PromptBuilder)."""
+        return self.prompts.build(self._listing(listing_id), theme, campus)
+
+    def _validator(self, listing_id: str = None) -> PostValidator:
+        """The listing's PostValidator, rebuilt when its details change."""
+        details = self._listing(listing_id)
+        key = listing_id or self.listing_id
+        cached = self._validators.get(key)
+        if cached is None or cached[0] is not details:
+            cached = self._validators[key] = (details, PostValidator(details))
+        return cached[1]
+
+    def _check_llm_text(self, text: str, listing_id: str = None, retrying: bool = False) -> str:
+        """LLM text cleaned to the "clean" style, or "" if it fails the listing's PostValidator.
 
-    def generate_daily_post(self) -> Dict[str, Any]:
-        """Generate a daily Facebook post for apartment rental."""
+        Rejections are reported and counted; `retrying` says whether the post will
+        be asked for again.
+        """
+        text, problem = self._validator(listing_id).process(text)
+        if problem is None:
+            return text
+        self.metrics.count("llm_rejected", reason=problem)
+        print(f"LLM post rejected ({problem.replace('_', ' ')}); "
+              f"{'asking again' if retrying else 'using a template post'}")
+        return ""
+
+    def _route(self) -> Optional[str]:
+        """The model for an LLM request, or None when every model is too slow (see ModelRouter)."""
+        model = self.router.choose()
+        if model is None:
+            self.metrics.count("llm_degraded")
+        return model
+
+    def _llm_text(self, theme: str, campus: str, listing_id: str = None,
+                  use_cache: bool = True, seed: int = None, timeout: float = None) -> Tuple[str, Optional[str]]:
+        """LLM text for a post and the model that wrote it.
+
+        `seed` is the post's sampling seed (a fresh one if not given), so posts
+        for the same theme and campus get different text and only a repeat of a
+        seed is served from the cache. The text is cleaned and checked (see
+        PostValidator); a rejected post is asked for again, with a seed derived
+        from `seed`, up to llm_resamples times, bypassing the cache. The text is
+        "" if every model is too slow, Ollama fails or no answer passes. `timeout`
+        limits the seconds spent on Ollama, counted from now and including resamples.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        model = self._route()
+        if model is None:
+            return "", None
+        prompt = self._build_prompt(theme, campus, listing_id)
+        seed = new_seed() if seed is None else seed
+        for attempt in range(self.llm_resamples + 1):
+            attempt_seed = derive_seed(seed, f"resample:{attempt}") if attempt else seed
+            text = self._call_ollama(prompt, use_cache=use_cache and attempt == 0, model=model,
+                                     seed=attempt_seed, deadline=deadline)
+            if not text:
+                break
+            text = self._check_llm_text(text, listing_id, retrying=attempt < self.llm_resamples)
+            if text:
+                return text, model
+        return "", model
+
+    def stream_daily_post(self, theme: str = None, campus: str = None, seed: int = None,
+                          listing_id: str = None, campus_weights: Dict[str, float] = None,
+                          use_cache: bool = True) -> PostStream:
+        """Generate a post with the LLM, delivering the text as Ollama produces it.
+
+        Theme, campus, campus weights, seed and listing work as in
+        generate_daily_post. If Ollama is unavailable or returns nothing, the text
+        of a template post for the same theme and campus is delivered instead. If
+        the finished text fails its PostValidator, the stream's post is a template
+        post. Emoji and hashtags are removed from the text as it streams.
+        `use_cache` works as in _call_ollama. The model is picked by the router, and
+        a template post is delivered if every model is too slow.
+        """
+        if theme is not None and theme not in self.post_themes:
+            raise ValueError(f"Unknown theme: {theme}")
+        if campus is not None and campus not in CAMPUSES:
+            raise ValueError(f"Unknown campus: {campus}")
+        seed = new_seed() if seed is None else seed
+        rng = random.Random(seed)
+        theme = theme or rng.choice(self.post_themes)
+        campus = campus or rng.choices(CAMPUSES, weights=campus_weight_list(campus_weights))[0]
+        listing_id = listing_id or self.listing_id
+        prompt = self._build_prompt(theme, campus, listing_id)
+        model = self._route()
+        options = self._llm_options(seed)
+        key = self.cache.make_key(model, prompt, options)
+        # Holds the template post written when Ollama gives no text
+        fallback = []
+        
+        metrics = self.metrics
+        
+        def tokens():
+            cached = self.cache.get(key) if use_cache and model else None
+            if cached is not None:
+                metrics.count("llm_cache", result="hit")
+                yield cached
+                return
+            produced = False
+            if model is not None:
+                metrics.count("llm_cache", result="miss")
+                started = time.perf_counter()
+                try:
+                    for token in clean_stream(self.ollama.generate_stream(model, prompt, options,
+                                                                          cancel=stream.cancel_event)):
+                        if not produced:
+                            metrics.observe("ollama_first_token", time.perf_counter() - started, model=model)
+                        produced = True
+                        yield token
+                except OllamaError as e:
+                    metrics.count("ollama_errors", error=type(e).__name__)
+                    print(f"Error calling Ollama: {e}")
+                if not stream.cancelled:
+                    self.router.record(model, time.perf_counter() - started)
+            if not produced and not stream.cancelled:
+                post = self.generate_daily_post(theme=theme, campus=campus, rng=rng, listing_id=listing_id)
+                post["seed"] = seed
+                fallback.append(post)
+                yield post["content"]
+        
+        def finish(text: str) -> Dict[str, Any]:
+            if fallback:
+                return fallback[0]
+            text = self._check_llm_text(text, listing_id)
+            if not text:
+                post = self.generate_daily_post(theme=theme, campus=campus, rng=rng, listing_id=listing_id)
+                post["seed"] = seed
+                return post
+            self.cache.set(key, text)
+            metrics.count("posts_generated", theme=theme, campus=campus, model_used=model)
+            return build_post(stream.date, theme, campus, text, model, seed, listing_id)
+        
+        stream = PostStream(datetime.now().strftime("%Y-%m-%d"), theme, campus, tokens(), finish)
+        return stream
+
+    def generate_daily_post(self, theme: str = None, campus: str = None, seed: int = None,
+                            rng: random.Random = None, listing_id: str = None,
+                            campus_weights: Dict[str, float] = None, use_llm: bool = False) -> Dict[str, Any]:
+        """Generate a daily Facebook post for apartment rental.
+
+        Theme and campus are chosen at random unless given; the campus is drawn
+        with `campus_weights` (campus -> weight, default 70% UCSB / 30% SBCC). All
+        random choices come from `rng`, or from a generator seeded with `seed` (a
+        fresh one if neither is given), so the same seed, theme and campus always
+        give the same post. The
+        seed is recorded in the post. `listing_id` picks a listing from the registry;
+        by default the post is for this agent's own listing.
+        
+        With `use_llm`, Ollama writes the post from a prompt built for the listing,
+        theme and campus; if it fails or its text fails its PostValidator, the post
+        comes from the templates as usual.
+        """
+        if theme is not None and theme not in self.post_themes:
+            raise ValueError(f"Unknown theme: {theme}")
+        if campus is not None and campus not in CAMPUSES:
+            raise ValueError(f"Unknown campus: {campus}")
+        if rng is None:
+            seed = new_seed() if seed is None else seed
+            rng = random.Random(seed)
+        timed = self.metrics.enabled
+        if timed:
+            started = time.perf_counter()
+        
         # Select a random theme for today
-        theme = random.choice(self.post_themes)
+        if theme is None:
+            theme = rng.choice(self.post_themes)
+        
+        # Prioritize UCSB students over SBCC
+        if campus is None:
+            campus = rng.choices(CAMPUSES, weights=campus_weight_list(campus_weights))[0]
         
-        # Prioritize UCSB students (70% chance), SBCC secondary (30% chance)
-        campus = random.choices(["UCSB", "SBCC"], weights=[0.7, 0.3])[0]
+        listing_id = listing_id or self.listing_id
+        if use_llm:
+            text, model = self._llm_text(theme, campus, listing_id, seed=seed)
+            if text:
+                self.metrics.count("posts_generated", theme=theme, campus=campus, model_used=model)
+                return build_post(datetime.now().strftime("%Y-%m-%d"), theme, campus, text, model, seed, listing_id)
         
         # 50% chance to use main templates, 50% chance to use fallback templates
-        use_main_templates = random.choice([True, False])
+        use_main_templates = rng.choice([True, False])
         
+        templates = self._engine(listing_id)
         if use_main_templates:
-            # Use main templates with formatting
-            template = random.choice(self.post_templates[theme])
-            
-            # Format template with apartment details
-            formatted_template = template.format(
-                address=self.apartment_details["address"],
-                bedrooms=self.apartment_details["bedrooms"],
-                bathrooms=self.apartment_details["bathrooms"],
-                campus=campus,
-                virtual_tour=self.apartment_details["contact"]["virtual_tour"],
-                rent=self.apartment_details["pricing"]["rent"],
-                deposit=self.apartment_details["pricing"]["deposit"],
-                first_month=self.apartment_details["pricing"]["first_month"],
-                last_month=self.apartment_details["pricing"]["last_month"],
-                total_due_at_signing=self.apartment_details["pricing"]["total_due_at_signing"]
-            )
-            
-            post_content = formatted_template
+            # Use main templates, precompiled with the apartment details
+            template = rng.choice(templates.compiled_main(theme))
             model_used = "template"
-            
         else:
             # Use fallback templates for variety
-            fallback_templates = {
-                "campus_proximity": [
-                    f"{campus} students! Your perfect spot is here!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nWalking distance to {campus} campus\nGreat location on the beach\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Roll out of bed and walk to {campus}!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nNo more long commutes - everything is walkable!\nGreat location on the beach\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"{campus} LIFE just got better!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nSteps away from campus + beach vibes = perfect student life!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!"
-                ],
-                "beach_lifestyle": [
-                    f"OCEANFRONT LIVING for {campus} students!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nWake up to ocean views every day!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Surf, study, repeat at {self.apartment_details['address']}!\n{self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath oceanfront unit\n1 Triple room OR 1 Double room available immediately!\nBeach access + {campus} proximity = student paradise!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Beach vibes meet {campus} life!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nPerfect for students who want the ultimate coastal experience!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!"
-                ],
-                "student_community": [
-                    f"Join the {campus} community at {self.apartment_details['address']}!\n{self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nConnect with fellow students in this vibrant beach community!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"{campus} STUDENT LIFE at its finest!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nJoin the best student community in Isla Vista!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"{campus} FRIENDSHIP starts here!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nBuild lasting connections in this student-friendly beach community!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!"
-                ],
-                "affordability": [
-                    f"BUDGET-FRIENDLY {campus} living!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nQuality housing that won't break the bank!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Perfect balance: Location + Affordability!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nGreat value for {campus} students in prime beach location!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Student budget approved! {self.apartment_details['address']}\n{self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nAffordable luxury for {campus} students!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!"
-                ],
-                "convenience": [
-                    f"Everything within walking distance!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\n{campus}, beach, shops, food - all nearby!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Convenience meets {campus} life!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nWalk to everything you need!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"No car needed! Everything is walkable!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\n{campus}, beach, restaurants, shopping - all steps away!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!"
-                ],
-                "move_in_ready": [
-                    f"Move-in ready for {campus} students!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nNo waiting - your new home is ready now!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Ready for immediate move-in!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nPerfect for {campus} students who need housing now!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Available immediately for {campus} students!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nNo delays - move in when you're ready!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!"
-                ],
-                "neighborhood_highlights": [
-                    f"Experience the best of Isla Vista!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nThe ultimate {campus} student experience!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"IV LIFE at its finest!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nPrime location in the heart of student life!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!",
-                    f"Premium Isla Vista location!\n{self.apartment_details['address']} - {self.apartment_details['bedrooms']} bed / {self.apartment_details['bathrooms']} bath\n1 Triple room OR 1 Double room available immediately!\nThe best spot for {campus} students in IV!\nRent: {self.apartment_details['pricing']['rent']}/month\nDue at signing: {self.apartment_details['pricing']['deposit']} deposit + {self.apartment_details['pricing']['first_month']} first month + {self.apartment_details['pricing']['last_month']} last month = {self.apartment_details['pricing']['total_due_at_signing']} total\nVirtual tour: {self.apartment_details['contact']['virtual_tour']}\nDM to apply or set up a tour!"
-                ]
-            }
-            
-            template = random.choice(fallback_templates.get(theme, fallback_templates["campus_proximity"]))
-            post_content = template
+            template = rng.choice(templates.compiled_fallback(theme))
             model_used = "fallback"
         
-        # Create the full post (no hashtags or creative styling)
-        full_post = post_content
+        if timed:
+            selected = time.perf_counter()
+        content = template.render(campus)
+        if timed:
+            self.metrics.observe("template_select", selected - started)
+            self.metrics.observe("template_render", time.perf_counter() - selected)
+            self.metrics.count("posts_generated", theme=theme, campus=campus, model_used=model_used)
+        return build_post(datetime.now().strftime("%Y-%m-%d"), theme, campus, content, model_used, seed, listing_id)
+
+    def regenerate_post(self, post: Dict[str, Any], use_llm: bool = False,
+                        max_attempts: int = 10) -> Dict[str, Any]:
+        """A new post for the same slot: same date, theme, campus and listing, different text.
+
+        Template posts are redrawn with a fresh seed until the text changes, up to
+        `max_attempts` times. With `use_llm`, Ollama writes the post, bypassing the
+        response cache so the text isn't simply the cached answer again; if Ollama
+        fails or the text fails its PostValidator, a template post is used. The
+        new post records the seed it was generated with.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        theme, campus, listing_id = post["theme"], post["target_campus"], post.get("listing_id")
+        if use_llm:
+            seed = new_seed()
+            text, model = self._llm_text(theme, campus, listing_id, use_cache=False, seed=seed)
+            if text:
+                return build_post(post["date"], theme, campus, text, model, seed,
+                                  listing_id or self.listing_id)
         
-        return {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "theme": theme,
-            "target_campus": campus,
-            "content": post_content,
-            "hashtags": "",
-            "full_post": full_post,
-            "character_count": len(full_post),
-            "model_used": model_used,
-            "creative_style": "clean"
-        }
+        for _ in range(max_attempts):
+            new_post = self.generate_daily_post(theme=theme, campus=campus, listing_id=listing_id)
+            if new_post["content"] != post["content"]:
+                break
+        new_post["date"] = post["date"]
+        return new_post
+
+    def generate_posts(self, n: int, theme: str = None, campus: str = None, seed: int = None,
+                       rng: random.Random = None, listing_id: str = None,
+                       campus_weights: Dict[str, float] = None) -> PostBatch:
+        """Generate a batch of posts, drawing all random choices up front.
+
+        Theme and campus are sampled like generate_daily_post unless fixed. Each
+        distinct (template, campus) pair is rendered once and shared across the batch.
+        Seeding and listing selection work as in generate_daily_post, with one
+        generator for the batch.
+        """
+        if theme is not None and theme not in self.post_themes:
+            raise ValueError(f"Unknown theme: {theme}")
+        if campus is not None and campus not in CAMPUSES:
+            raise ValueError(f"Unknown campus: {campus}")
+        if rng is None:
+            seed = new_seed() if seed is None else seed
+            rng = random.Random(seed)
+        
+        themes = [theme] * n if theme else rng.choices(self.post_themes, k=n)
+        campuses = [campus] * n if campus else rng.choices(CAMPUSES, weights=campus_weight_list(campus_weights), k=n)
+        return self._render_batch(themes, campuses, rng, seed, listing_id or self.listing_id)
+
+    def sample_by_theme(self, k: int, seed: int = 0, listing_id: str = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Generate exactly k posts for every theme in one batch.
+
+        Campuses are sampled with the usual weights from a generator seeded with
+        `seed`, so the same arguments always give the same samples.
+        """
+        rng = random.Random(seed)
+        themes = [theme for theme in self.post_themes for _ in range(k)]
+        campuses = rng.choices(CAMPUSES, weights=CAMPUS_WEIGHTS, k=len(themes))
+        posts = self._render_batch(themes, campuses, rng, seed, listing_id or self.listing_id).to_dicts()
+        return {theme: posts[i * k:(i + 1) * k] for i, theme in enumerate(self.post_themes)}
+
+    def _render_batch(self, themes: List[str], campuses: List[str], rng: random.Random,
+                      seed: Optional[int], listing_id: str) -> PostBatch:
+        """Draw a template for each (theme, campus) slot and render the batch."""
+        timed = self.metrics.enabled
+        if timed:
+            started = time.perf_counter()
+        n = len(themes)
+        templates = self._engine(listing_id)
+        
+        # Group positions by theme so each theme's templates are drawn in one call
+        positions = {}
+        for i, post_theme in enumerate(themes):
+            positions.setdefault(post_theme, []).append(i)
+        
+        contents = [None] * n
+        models = [None] * n
+        rendered = {}
+        for post_theme, indices in positions.items():
+            variants, cum_weights = templates.variant_pool(post_theme)
+            picks = rng.choices(variants, cum_weights=cum_weights, k=len(indices))
+            for i, (model_used, template) in zip(indices, picks):
+                key = (template, campuses[i])
+                content = rendered.get(key)
+                if content is None:
+                    content = rendered[key] = template.render(campuses[i])
+                contents[i] = content
+                models[i] = model_used
+        
+        if timed:
+            self.metrics.observe("template_render_batch", time.perf_counter() - started, size=_size_bucket(n))
+            self._count_posts(themes, campuses, models)
+        return PostBatch(datetime.now().strftime("%Y-%m-%d"), themes, campuses, contents, models,
+                         seed, listing_id)
+
+    def generate_llm_posts(self, n: int, theme: str = None, campus: str = None, seed: int = None,
+                           listing_id: str = None, concurrency: int = 4, deadline: float = 30.0,
+                           campus_weights: Dict[str, float] = None, on_result=None,
+                           cancel=None) -> List[Dict[str, Any]]:
+        """Generate n posts with the LLM, running up to `concurrency` Ollama requests at once.
+
+        Posts whose request fails or misses its deadline fall back to templates.
+        `on_result(index, post)` is called as each post finishes, and setting the
+        `cancel` event stops sending new requests.
+        """
+        from async_generation import AsyncPostGenerator
+        generator = AsyncPostGenerator(self, concurrency=concurrency, deadline=deadline)
+        return generator.run(n, theme=theme, campus=campus, seed=seed, listing_id=listing_id,
+                             campus_weights=campus_weights, on_result=on_result, cancel=cancel)
 
-    def schedule_weekly_posts(self) -> List[Dict[str, Any]]:
-        """Generate a week's worth of posts."""
-        posts = []
-        for i in range(7):
-            # Simulate different days
-            post_date = datetime.now() + timedelta(days=i)
-            post = self.generate_daily_post()
-            post["date"] = post_date.strftime("%Y-%m-%d")
-            posts.append(post)
+    def plan_posts(self, days: int, start_date: datetime = None, seed: int = None,
+                   listing_ids: List[str] = None, campus: str = None,
+                   campus_weights: Dict[str, float] = None) -> List[Dict[str, Any]]:
+        """Plan and render one post per day per listing over a horizon of `days` days.
+
+        Themes, campuses and templates are assigned by the scheduler (see
+        PostScheduler) rather than drawn independently, so every week covers all
+        themes, no theme runs two days in a row and campuses follow `campus_weights`
+        (default 70/30).
+        Each listing's plan uses its own generator derived from `seed`. Posts are
+        ordered by date, then by listing; the default is this agent's own listing,
+        starting today.
+        """
+        if campus is not None and campus not in CAMPUSES:
+            raise ValueError(f"Unknown campus: {campus}")
+        timed = self.metrics.enabled
+        if timed:
+            started = time.perf_counter()
+        seed = new_seed() if seed is None else seed
+        start_date = start_date or datetime.now()
+        dates = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+        listing_ids = listing_ids or [self.listing_id]
+        weights = campus_weight_list(campus_weights)
+        
+        columns = []
+        for k, listing_id in enumerate(listing_ids):
+            templates = self._engine(listing_id)
+            pools = {theme: templates.variant_pool(theme)[0] for theme in self.post_themes}
+            themes, campuses, picks = self.scheduler.plan(
+                days, random.Random(derive_seed(seed, k)), lambda theme: len(pools[theme]), campus,
+                weights
+            )
+            
+            # Render each distinct (template, campus) pair once
+            rendered = {}
+            contents = []
+            models = []
+            for theme, post_campus, pick in zip(themes, campuses, picks):
+                model_used, template = pools[theme][pick]
+                key = (template, post_campus)
+                content = rendered.get(key)
+                if content is None:
+                    content = rendered[key] = template.render(post_campus)
+                contents.append(content)
+                models.append(model_used)
+            columns.append((listing_id, themes, campuses, contents, models))
+            if timed:
+                self._count_posts(themes, campuses, models)
+        
+        if timed:
+            self.metrics.observe("plan_posts", time.perf_counter() - started)
+        return [
+            build_post(date, themes[i], campuses[i], contents[i], models[i], seed, listing_id)
+            for i, date in enumerate(dates)
+            for listing_id, themes, campuses, contents, models in columns
+        ]
+
+    def schedule_weekly_posts(self, use_llm: bool = False, seed: int = None, listing_id: str = None,
+                              avoid_duplicates: bool = True) -> List[Dict[str, Any]]:
+        """Generate a week's worth of posts, starting today.
+
+        The week is planned with plan_posts, so it covers every theme. With
+        `use_llm`, the LLM writes each planned slot. Unless `avoid_duplicates` is
+        False, posts that nearly repeat recent history or an earlier day of the
+        week are resampled, keeping their theme and campus.
+        """
+        posts = self.plan_posts(7, seed=seed, listing_ids=[listing_id or self.listing_id])
+        if use_llm:
+            from async_generation import AsyncPostGenerator
+            posts = AsyncPostGenerator(self).run_slots(posts)
+        if avoid_duplicates:
+            posts = list(self.avoid_near_duplicates(posts))
         return posts
 
+    def avoid_near_duplicates(self, posts: Iterable[Dict[str, Any]],
+                              max_attempts: int = 10) -> Iterator[Dict[str, Any]]:
+        """The posts, lazily, with near-repeats of saved history or of an earlier post redrawn.
+
+        Replacements are template posts for the same date, theme, campus and
+        listing, drawn from a stream derived from the batch seed, so a seeded plan
+        stays reproducible. If every one of `max_attempts` redraws is a near-repeat
+        too, the least similar post is kept and counted as a dedup miss.
+        """
+        history = self.dedup_index
+        batch = NearDuplicateIndex(history.max_distance, window=None)
+        rng = None
+        for post in posts:
+            distance = self._duplicate_distance(post["full_post"], history, batch)
+            if distance is not None:
+                slot = post
+                if rng is None:
+                    rng = random.Random(derive_seed(slot["seed"], "dedup") if slot["seed"] is not None else None)
+                for _ in range(max_attempts):
+                    candidate = self.generate_daily_post(slot["theme"], slot["target_campus"], rng=rng,
+                                                         listing_id=slot["listing_id"])
+                    candidate["date"] = slot["date"]
+                    candidate["seed"] = slot["seed"]
+                    candidate_distance = self._duplicate_distance(candidate["full_post"], history, batch)
+                    if candidate_distance is None or candidate_distance > distance:
+                        post, distance = candidate, candidate_distance
+                        if distance is None:
+                            break
+                if distance is not None:
+                    self.metrics.count("dedup_misses")
+                    print(f"No distinct post found for {slot['date']} ({label(slot['theme'])}) "
+                          f"in {max_attempts} tries; keeping the least similar one")
+            batch.add(post["full_post"])
+            yield post
+
+    @staticmethod
+    def _duplicate_distance(text: str, *indexes: NearDuplicateIndex) -> Optional[int]:
+        """Bit distance from the text to its closest near-duplicate in the indexes, or None if it has none."""
+        distances = [d for d in (index.nearest_distance(text) for index in indexes) if d is not None]
+        return min(distances, default=None)
+
+    def _count_posts(self, themes: List[str], campuses: List[str], models: List[str]):
+        """Count generated posts by theme, campus and model_used."""
+        for (theme, campus, model_used), n in Counter(zip(themes, campuses, models)).items():
+            self.metrics.count("posts_generated", n, theme=theme, campus=campus, model_used=model_used)
+
+    @property
+    def dedup_index(self) -> NearDuplicateIndex:
+        """Fingerprints of posts saved for the last DEDUP_HISTORY_DAYS days, kept in step with the post store.
+
+        Built from the store on first use; each later use adds the posts saved
+        since, by this agent or another process, and drops those that aged out.
+        """
+        since = (datetime.now() - timedelta(days=DEDUP_HISTORY_DAYS)).strftime("%Y-%m-%d")
+        store = self.store
+        with self._dedup_lock:
+            if self._dedup_index is None or len(store) < self._dedup_records:
+                # Bounded by date rather than count, so every listing keeps a full year of history
+                self._dedup_index = NearDuplicateIndex(window=None)
+                self._dedup_records = 0
+            added = store.records(self._dedup_records)
+            for post in added:
+                if post["date"] >= since:
+                    self._dedup_index.add(post.get("full_post") or post["content"], post["date"])
+            self._dedup_records += len(added)
+            self._dedup_index.forget_before(since)
+            return self._dedup_index
+
+    @property
+    def store(self) -> PostStore:
+        """Append-only store of saved posts, opened on first use (POST_STORE_PATH, default posts.jsonl)."""
+        if self._store is None:
+            self._store = PostStore(os.getenv('POST_STORE_PATH', 'posts.jsonl'))
+        return self._store
+
+    def save_posts(self, posts: List[Dict[str, Any]]) -> List[int]:
+        """Append posts to the post store in one write."""
+        with self.metrics.timer("save_posts"):
+            record_ids = self.store.extend(posts)
+        self.metrics.count("posts_saved", len(posts))
+        return record_ids
+
     def save_post_to_file(self, post: Dict[str, Any], filename: str = None):
-        """Save the generated post to a file."""
-        if not filename:
-            filename = f"facebook_post_{datetime.now().strftime('%Y%m%d')}.json"
-        
-        with open(filename, 'w') as f:
-            json.dump(post, f, indent=2)
+        """Save the generated post to the post store, or to a JSON file if a filename is given."""
+        if filename:
+            with open(filename, 'w') as f:
+                json.dump(as_dict(post), f, indent=2)
+        else:
+            self.save_posts([post])
+            filename = self.store.path
         
         print(f"Post saved to {filename}")
 
-    def list_available_models(self) -> List[str]:
-        """List available Ollama models."""
-        try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models = response.json().get('models', [])
-                return [model['name'] for model in models]
-            return []
-        except:
-            return []
+    def list_available_models(self, refresh: bool = False) -> List[str]:
+        """List available Ollama models.
+
+        The list is fetched once and cached; `refresh` asks Ollama again. An empty
+        list is returned while Ollama is unreachable, and the next call retries.
+        """
+        if self._models is None or refresh:
+            try:
+                self._models = self.ollama.list_models()
+            except OllamaError:
+                self._models = None
+        return list(self._models or [])
 
 
 
-def preview_post(post: Dict[str, Any]):
-    """Display a formatted preview of the Facebook post."""
+def preview_post(post: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Display a formatted preview of the Facebook post.
+
+    A PostStream is previewed as its text arrives; Ctrl+C cancels it. Returns the
+    finished post, or None if generation was cancelled.
+    """
+    if isinstance(post, PostStream):
+        return _preview_stream(post)
+    
+    # Rendered once per post and cached (see post_render)
+    print(preview_text(post))
+    return post
+
+def _preview_stream(stream: PostStream) -> Optional[Dict[str, Any]]:
+    """Print a streaming post as it is generated, then its details."""
     print("\n" + "="*60)
-    print("📱 FACEBOOK POST PREVIEW")
+    print("📱 FACEBOOK POST PREVIEW (streaming)")
     print("="*60)
-    
-    # Post metadata
-    print(f"📅 Date: {post['date']}")
-    print(f"🎯 Target Audience: {post['target_campus']} students")
-    print(f"📌 Theme: {post['theme'].replace('_', ' ').title()}")
-    print(f"🤖 Generated by: {post.get('model_used', 'unknown')}")
-    print(f"🎨 Creative Style: {post.get('creative_style', 'standard').replace('_', ' ').title()}")
-    print(f"📊 Character count: {post['character_count']}")
-    
-    if 'note' in post:
-        print(f"⚠️  Note: {post['note']}")
+    print(f"📅 Date: {stream.date}")
+    print(f"🎯 Target Audience: {stream.target_campus} students")
+    print(f"📌 Theme: {label(stream.theme)}")
     
     print("\n" + "-"*60)
     print("📝 POST CONTENT:")
     print("-"*60)
-    print(post['content'])
+    try:
+        for token in stream:
+            print(token, end="", flush=True)
+    except KeyboardInterrupt:
+        stream.cancel()
+        print("\n⏹️  Generation cancelled")
+        return None
+    print()
     print("-"*60)
     
-    # Facebook preview simulation
-    print("\n📱 HOW IT WOULD LOOK ON FACEBOOK:")
-    print("─" * 40)
-    print(f"🏠 Your Name • {post['date']}")
-    print("─" * 40)
-    print(post['content'])
-    print("─" * 40)
-    print("👍 Like • 💬 Comment • 🔄 Share")
-    print("="*60)
+    post = stream.post
+    print(f"🤖 Generated by: {post['model_used']}")
+    print(f"📊 Character count: {post['character_count']}")
+    print(facebook_text(post['date'], post['content']))
+    return post
 
 def test_post_generation(agent: FacebookRentalAgent, num_posts: int = 3):
     """Test and preview multiple posts."""
@@ -335,29 +862,35 @@ def test_post_generation(agent: FacebookRentalAgent, num_posts: int = 3):
         if i < num_posts - 1:
             input("\n⏸️  Press Enter to generate next post...")
 
-def main():
-    """Main function to run the Facebook Rental Agent."""
-    print("🏠 Facebook Rental Agent for Isla Vista (Ollama Edition)")
-    print("=" * 60)
-    
-    # Check Ollama connection
-    agent = FacebookRentalAgent()
-    
+def check_ollama(agent: FacebookRentalAgent) -> bool:
+    """Make sure Ollama is reachable before an AI post, explaining how to start it if not."""
+    probed = agent._models is not None
     if not agent._check_ollama_connection():
         print("❌ Ollama is not running or not accessible!")
         print("💡 Please start Ollama first:")
         print("   1. Install Ollama: https://ollama.ai/")
         print("   2. Start Ollama: ollama serve")
         print("   3. Pull a model: ollama pull llama2")
-        print("   4. Run this script again")
-        return
+        print("   Template posts (options 1-4) work without it.")
+        return False
+    
+    # Show available models the first time we connect
+    if not probed:
+        models = agent.list_available_models()
+        if models:
+            print(f"✅ Ollama connected! Available models: {', '.join(models)}")
+        else:
+            print("⚠️  Ollama connected but no models found. Pull a model with: ollama pull llama2")
+    return True
+
+
+def main():
+    """Main function to run the Facebook Rental Agent."""
+    print("🏠 Facebook Rental Agent for Isla Vista (Ollama Edition)")
+    print("=" * 60)
     
-    # Show available models
-    models = agent.list_available_models()
-    if models:
-        print(f"✅ Ollama connected! Available models: {', '.join(models)}")
-    else:
-        print("⚠️  Ollama connected but no models found. Pull a model with: ollama pull llama2")
+    # Template posts work offline; Ollama is only checked when an AI post is requested
+    agent = FacebookRentalAgent()
     
     # Main menu
     while True:
@@ -368,11 +901,12 @@ def main():
         print("2. 🧪 Test multiple posts")
         print("3. 📅 Generate weekly posts")
         print("4. 🎲 Generate random theme post")
-        print("5. 📊 Show post statistics")
-        print("6. 🚪 Exit")
+        print("5. 🤖 Stream an AI-written post")
+        print("6. 📊 Show post statistics")
+        print("7. 🚪 Exit")
         print("="*60)
         
-        choice = input("\nSelect an option (1-6): ").strip()
+        choice = input("\nSelect an option (1-7): ").strip()
         
         if choice == "1":
             # Generate today's post
@@ -409,36 +943,57 @@ def main():
             # Save weekly posts
             save_choice = input("\n💾 Save all weekly posts to file? (y/n): ").lower()
             if save_choice == 'y':
-                filename = f"weekly_posts_{datetime.now().strftime('%Y%m%d')}.json"
-                with open(filename, "w") as f:
-                    json.dump(weekly_posts, f, indent=2)
-                print(f"✅ Weekly posts saved to {filename}")
+                agent.save_posts(weekly_posts)
+                print(f"✅ Weekly posts saved to {agent.store.path}")
                 
         elif choice == "4":
             # Generate random theme post
             theme = random.choice(agent.post_themes)
-            print(f"\n🎲 Generating post with theme: {theme.replace('_', ' ').title()}")
-            post = agent.generate_daily_post()
+            print(f"\n🎲 Generating post with theme: {label(theme)}")
+            post = agent.generate_daily_post(theme=theme)
             preview_post(post)
             
         elif choice == "5":
+            # Stream a post from the LLM as it is written
+            if not check_ollama(agent):
+                continue
+            print(f"\n🤖 Writing a post with {agent.model_name} (Ctrl+C to cancel)...")
+            post = preview_post(agent.stream_daily_post())
+            
+            if post:
+                save_choice = input("\n💾 Save this post to file? (y/n): ").lower()
+                if save_choice == 'y':
+                    agent.save_post_to_file(post)
+            
+        elif choice == "6":
             # Show post statistics
             print("\n📊 POST GENERATION STATISTICS")
             print("="*40)
+            print(f"Listings: {len(agent.registry)} (current: {agent.listing_id})")
             print(f"Available themes: {len(agent.post_themes)}")
             print(f"Target campuses: {len(agent.apartment_details['target_audience'])}")
             print(f"Apartment features: {len(agent.apartment_details['features'])}")
             print(f"Model being used: {agent.model_name}")
+            print(f"Saved posts: {len(agent.store)} in {agent.store.path}")
             print(f"Ollama URL: {agent.ollama_url}")
+            if agent._models is not None:
+                print(f"Ollama models: {', '.join(agent._models) or 'none'}")
+            for model, latency in agent.router.stats().items():
+                if latency["count"]:
+                    print(f"  {model}: {latency['count']} requests, p50 {latency['p50']:.2f}s, "
+                          f"p95 {latency['p95']:.2f}s (target {agent.router.p95_target:g}s)")
+            cache_stats = agent.cache.stats()
+            print(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                  f"({cache_stats['hit_rate']:.0%} hit rate)")
             
-        elif choice == "6":
+        elif choice == "7":
             print("\n👋 Thanks for using the Facebook Rental Agent!")
             break
             
         else:
-            print("❌ Invalid option. Please select 1-6.")
+            print("❌ Invalid option. Please select 1-7.")
         
-        if choice in ["1", "2", "3", "4"]:
+        if choice in ["1", "2", "3", "4", "5"]:
             input("\n⏸️  Press Enter to continue...")
 
 if __name__ == "__main__":
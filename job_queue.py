@@ -0,0 +1,139 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class Job:
+    """A unit of background work with per-item results and progress.
+
+    The job function receives the Job and reports each finished item with
+    `set_result`. Items still being written can publish their text so far with
+    `set_partial`, and long jobs should check `cancelled` between items.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, job_id: str, total: int = 1, key: Optional[Hashable] = None):
+        self.id = job_id
+        self.key = key
+        self.total = total
+        self.status = self.QUEUED
+        self.results: List[Optional[Any]] = [None] * total
+        self.partial: Dict[int, str] = {}
+        self.completed = 0
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_result(self, index: int, value: Any):
+        with self._lock:
+            if self.results[index] is None:
+                self.completed += 1
+            self.results[index] = value
+            self.partial.pop(index, None)
+
+    def set_partial(self, index: int, text: str):
+        self.partial[index] = text
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Ask the job to stop; items already finished are kept."""
+        self.cancel_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes or `timeout` seconds pass; returns whether it finished."""
+        return self._done.wait(timeout)
+
+    def _finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+
+class JobQueue:
+    """Runs jobs on a shared pool of worker threads.
+
+    Submitting with a `key` that matches a queued, running or successfully
+    finished job returns that job instead of starting another, so identical
+    requests from several browser sessions share one piece of work. The most
+    recent `max_jobs` jobs are kept for lookup by id.
+    """
+
+    def __init__(self, workers: int = 4, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rental-agent-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: Dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[Job], None], total: int = 1, key: Optional[Hashable] = None) -> Job:
+        """Queue fn(job) for a worker thread and return the job."""
+        with self._lock:
+            if key is not None and key in self._by_key:
+                existing = self._jobs.get(self._by_key[key])
+                if existing is not None and existing.status not in (Job.FAILED, Job.CANCELLED):
+                    self._jobs.move_to_end(existing.id)
+                    return existing
+            job = Job(uuid.uuid4().hex[:12], total, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job.id
+            self._evict()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _evict(self):
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:max(0, excess)]:
+            job = self._jobs.pop(job_id)
+            if job.key is not None and self._by_key.get(job.key) == job_id:
+                del self._by_key[job.key]
+
+    def _run(self, job: Job, fn: Callable[[Job], None]):
+        if job.cancelled:
+            job._finish(Job.CANCELLED)
+            return
+        job.status = Job.RUNNING
+        try:
+            fn(job)
+        except Exception as e:
+            job._finish(Job.FAILED, str(e))
+        else:
+            job._finish(Job.CANCELLED if job.cancelled else Job.DONE)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self) -> int:
+        """Number of jobs queued or running."""
+        with self._lock:
+            return sum(not job.finished for job in self._jobs.values())
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+        self._executor.shutdown(wait=wait)
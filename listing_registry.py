@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from template_engine import TemplateEngine
+
+DEFAULT_LISTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "listings.json")
+
+
+def _intern(value: Any) -> Any:
+    """Intern every string in a listing so values repeated across listings are stored once."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(key): _intern(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_intern(item) for item in value]
+    return value
+
+
+class ListingRegistry:
+    """Apartment listings keyed by id, each in the `apartment_details` shape.
+
+    Listing strings are interned, so features, amenities, tone and contact details
+    shared across units are stored once. The raw post templates are shared by every
+    listing. Each listing's compiled template set is built on first use and kept in
+    an LRU of at most `max_compiled` listings.
+    """
+
+    def __init__(self, listings: Dict[str, Dict[str, Any]], post_templates: Dict[str, List[str]],
+                 fallback_templates: Dict[str, List[str]], max_compiled: int = 64):
+        if not listings:
+            raise ValueError("A listing registry needs at least one listing")
+        self._listings = {sys.intern(listing_id): _intern(details) for listing_id, details in listings.items()}
+        self.post_templates = post_templates
+        self.fallback_templates = fallback_templates
+        self.max_compiled = max_compiled
+        self._engines: "OrderedDict[str, TemplateEngine]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, post_templates: Dict[str, List[str]],
+             fallback_templates: Dict[str, List[str]], **kwargs) -> "ListingRegistry":
+        """Load listings from a JSON file mapping listing id to apartment details."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), post_templates, fallback_templates, **kwargs)
+
+    @property
+    def default_id(self) -> str:
+        """The first listing in the data file."""
+        return next(iter(self._listings))
+
+    def ids(self) -> List[str]:
+        return list(self._listings)
+
+    def get(self, listing_id: str) -> Dict[str, Any]:
+        """Apartment details for a listing; raises KeyError for unknown ids."""
+        try:
+            return self._listings[listing_id]
+        except KeyError:
+            raise KeyError(f"Unknown listing: {listing_id}") from None
+
+    def update(self, listing_id: str, details: Dict[str, Any]):
+        """Add or replace a listing, dropping its compiled templates."""
+        with self._lock:
+            self._listings[sys.intern(listing_id)] = _intern(details)
+            self._engines.pop(listing_id, None)
+
+    def engine(self, listing_id: str) -> TemplateEngine:
+        """The listing's template engine, compiled lazily on first render."""
+        with self._lock:
+            engine = self._engines.get(listing_id)
+            if engine is None:
+                engine = TemplateEngine(self.post_templates, self.fallback_templates, self.get(listing_id))
+                self._engines[listing_id] = engine
+                while len(self._engines) > self.max_compiled:
+                    self._engines.popitem(last=False)
+            else:
+                self._engines.move_to_end(listing_id)
+            return engine
+
+    def __contains__(self, listing_id: str) -> bool:
+        return listing_id in self._listings
+
+    def __len__(self) -> int:
+        return len(self._listings)
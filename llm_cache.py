@@ -0,0 +1,128 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """Content-addressed cache of Ollama responses.
+
+    Entries are keyed by a hash of the model name, prompt and generation options.
+    Lookups go to an in-memory LRU first and then, if `path` is given, to a SQLite
+    file that survives restarts. Entries older than `ttl` seconds are treated as
+    misses, and each tier evicts its least recently used entries beyond its size.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 path: Optional[str] = None, max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            import sqlite3
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """Hash the inputs that determine a response."""
+        payload = json.dumps([model, prompt, options or {}], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for the key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, response, created)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return response
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str):
+        """Store a response in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, response: str, created: float):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, to see how much inference the cache is saving."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._memory),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,277 @@
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets
+TIMER_BUCKETS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Sinks served at /metrics by this process, by port
+_served: Dict[int, "InMemorySink"] = {}
+_served_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsSink:
+    """Receives counter increments and timings from Metrics."""
+
+    def counter(self, name: str, labels: Labels, value: float):
+        pass
+
+    def timing(self, name: str, labels: Labels, seconds: float):
+        pass
+
+
+class InMemorySink(MetricsSink):
+    """Aggregates counters and latency histograms in memory, for the UI and the Prometheus endpoint."""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        # name, labels -> [count, total, max, bucket counts...]
+        self._timers: Dict[Tuple[str, Labels], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, labels: Labels, value: float):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def timing(self, name: str, labels: Labels, seconds: float):
+        key = (name, labels)
+        with self._lock:
+            stats = self._timers.get(key)
+            if stats is None:
+                stats = self._timers[key] = [0, 0.0, 0.0] + [0] * (len(TIMER_BUCKETS) + 1)
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3 + bisect_left(TIMER_BUCKETS, seconds)] += 1
+
+    def counters(self, name: str) -> Dict[Labels, float]:
+        """Values of one counter, by label set."""
+        with self._lock:
+            return {labels: value for (counter, labels), value in self._counters.items() if counter == name}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every counter and timer as plain data; timers report count, mean and max in milliseconds."""
+        with self._lock:
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            timers = {}
+            for (name, labels), stats in self._timers.items():
+                count, total, longest = stats[:3]
+                timers.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": count,
+                    "mean_ms": total / count * 1e3,
+                    "max_ms": longest * 1e3,
+                })
+        return {"counters": counters, "timers": timers}
+
+    def prometheus_text(self, prefix: str = "rental_agent_") -> str:
+        """Metrics in the Prometheus text exposition format; timers become histograms."""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timers = sorted((key, list(stats)) for key, stats in self._timers.items())
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{label_text(labels)} {value}")
+        for (name, labels), stats in timers:
+            metric = f"{prefix}{name}_seconds"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            cumulative = 0
+            for bound, bucket_count in zip(TIMER_BUCKETS + (float("inf"),), stats[3:]):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{metric}_sum{label_text(labels)} {stats[1]}")
+            lines.append(f"{metric}_count{label_text(labels)} {stats[0]}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+
+class JsonLogSink(MetricsSink):
+    """Writes every counter increment and timing as one JSON line, for log shipping."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+    def counter(self, name: str, labels: Labels, value: float):
+        self._write({"ts": time.time(), "type": "counter", "name": name, "labels": dict(labels), "value": value})
+
+    def timing(self, name: str, labels: Labels, seconds: float):
+        self._write({"ts": time.time(), "type": "timer", "name": name, "labels": dict(labels),
+                     "ms": round(seconds * 1e3, 4)})
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._timing(self.name, self.labels, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Timers and counters for the agent, sent to any number of sinks.
+
+    With no sinks, `enabled` is False and every call returns at once. Hot paths
+    check `enabled` before reading the clock, so disabled metrics cost a few
+    attribute lookups per post.
+    """
+
+    def __init__(self, sinks: Optional[List[MetricsSink]] = None):
+        self.sinks = list(sinks or [])
+        self.enabled = bool(self.sinks)
+
+    def count(self, name: str, value: float = 1, **labels):
+        if self.enabled:
+            key = _labels(labels)
+            for sink in self.sinks:
+                sink.counter(name, key, value)
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record a duration measured by the caller."""
+        if self.enabled:
+            self._timing(name, _labels(labels), seconds)
+
+    def timer(self, name: str, **labels):
+        """Context manager timing its block."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, _labels(labels))
+
+    def _timing(self, name: str, labels: Labels, seconds: float):
+        for sink in self.sinks:
+            sink.timing(name, labels, seconds)
+
+    def memory(self) -> Optional[InMemorySink]:
+        """The first in-memory sink, if there is one."""
+        return next((sink for sink in self.sinks if isinstance(sink, InMemorySink)), None)
+
+
+def serve_prometheus(sink: InMemorySink, port: int, host: str = "127.0.0.1"):
+    """Serve the sink at http://host:port/metrics from a background thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = sink.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def prometheus_sink(port: int, sink: Optional[InMemorySink] = None) -> InMemorySink:
+    """The sink served at /metrics on `port`, serving `sink` (or a new one) if nothing is served there yet.
+
+    Every agent in the process asking for the same port gets the one sink, so
+    the server is started once and reports their combined totals.
+    """
+    with _served_lock:
+        served = _served.get(port)
+        if served is None:
+            served = sink if sink is not None else InMemorySink()
+            serve_prometheus(served, port)
+            _served[port] = served
+        return served
+
+
+def metrics_from_env(value: Optional[str] = None) -> Metrics:
+    """Build Metrics from AGENT_METRICS, a comma-separated list of sinks.
+
+    `memory` keeps in-memory totals, `json` logs to stderr (`json:PATH` appends to
+    a file), and `prometheus:PORT` keeps totals and serves them at /metrics. Unset
+    or empty disables metrics. A port already served by this process is not
+    served again; its sink is shared (see prometheus_sink).
+    """
+    value = os.getenv("AGENT_METRICS", "") if value is None else value
+    sinks: List[MetricsSink] = []
+    memory = None
+    for spec in filter(None, (part.strip() for part in value.split(","))):
+        kind, _, arg = spec.partition(":")
+        if kind == "prometheus":
+            served = prometheus_sink(int(arg or 9108), memory)
+            if served is not memory:
+                sinks.append(served)
+            if memory is None:
+                memory = served
+        elif kind == "memory":
+            if memory is None:
+                memory = InMemorySink()
+                sinks.append(memory)
+        elif kind == "json":
+            sinks.append(JsonLogSink(open(arg, "a", encoding="utf-8") if arg else None))
+        else:
+            raise ValueError(f"Unknown metrics sink: {spec}")
+    return Metrics(sinks)
@@ -0,0 +1,127 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from ollama_client import OllamaClient, OllamaError
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class LatencyStats:
+    """Recent request latencies for one model.
+
+    At most `window` samples are kept, and samples older than `max_age` seconds
+    are dropped, so a model judged slow gets another chance once its slow
+    samples have aged out.
+    """
+
+    def __init__(self, window: int = 50, max_age: float = 600.0):
+        self.max_age = max_age
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append((time.monotonic(), seconds))
+
+    def recent(self) -> List[float]:
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        return [seconds for _, seconds in self._samples]
+
+    def summary(self) -> Dict[str, float]:
+        """Count, p50 and p95 (in seconds) of the recent samples."""
+        recent = self.recent()
+        if not recent:
+            return {"count": 0}
+        return {"count": len(recent), "p50": percentile(recent, 50), "p95": percentile(recent, 95)}
+
+
+class ModelRouter:
+    """Picks the Ollama model for each LLM request.
+
+    `models` lists the models to use in order of preference, best first; the
+    later ones should be smaller and faster. Each request goes to the first
+    installed model whose recent p95 latency is within `p95_target` seconds
+    (models with fewer than `min_samples` recent requests are given the benefit
+    of the doubt). If every model is over target, choose() returns None and the
+    caller should use templates. `installed` returns the installed models; while
+    it is empty (Ollama not probed or down), `models` is used as given.
+    """
+
+    def __init__(self, ollama: OllamaClient, models: List[str], installed: Callable[[], List[str]],
+                 p95_target: float = 10.0, min_samples: int = 5, window: int = 50, max_age: float = 600.0):
+        if not models:
+            raise ValueError("A model router needs at least one model")
+        self.ollama = ollama
+        self.models = list(models)
+        self.installed = installed
+        self.p95_target = p95_target
+        self.min_samples = min_samples
+        self._stats = {model: LatencyStats(window, max_age) for model in self.models}
+        self._lock = threading.Lock()
+        self._warm_stop: Optional[threading.Event] = None
+
+    def candidates(self) -> List[str]:
+        installed = set(self.installed())
+        return [model for model in self.models if model in installed] or list(self.models)
+
+    def _within_target(self, model: str) -> bool:
+        recent = self._stats[model].recent()
+        return len(recent) < self.min_samples or percentile(recent, 95) <= self.p95_target
+
+    def choose(self) -> Optional[str]:
+        """The model for the next request, or None to fall back to templates."""
+        candidates = self.candidates()
+        with self._lock:
+            return next((model for model in candidates if self._within_target(model)), None)
+
+    def record(self, model: str, seconds: float):
+        """Record how long a request to `model` took, including failed ones."""
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = self._stats[model] = LatencyStats()
+            stats.record(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Latency summary for every model, by name."""
+        with self._lock:
+            return {model: stats.summary() for model, stats in self._stats.items()}
+
+    def warm(self, model: Optional[str] = None) -> bool:
+        """Load a model (by default the current choice) into Ollama's memory; returns success."""
+        model = model or self.choose()
+        if model is None:
+            return False
+        try:
+            self.ollama.preload(model)
+            return True
+        except OllamaError:
+            return False
+
+    def keep_warm(self, interval: float = 600.0):
+        """Preload the current choice now and every `interval` seconds from a background thread.
+
+        Keep `interval` shorter than the client's keep_alive so the model is never
+        unloaded while idle. Calling again restarts the thread with the new interval.
+        """
+        self.stop_warming()
+        stop = self._warm_stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                self.warm()
+                stop.wait(interval)
+
+        threading.Thread(target=run, name="rental-agent-warm", daemon=True).start()
+
+    def stop_warming(self):
+        if self._warm_stop is not None:
+            self._warm_stop.set()
+            self._warm_stop = None
@@ -0,0 +1,246 @@
+import json
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# (connect, read) timeouts in seconds for each Ollama endpoint
+DEFAULT_TIMEOUTS = {
+    "generate": (3.05, 15),  # Much shorter read timeout for small model
+    "tags": (3.05, 5),
+}
+
+
+class OllamaError(Exception):
+    """Raised when Ollama cannot be reached or returns an error."""
+
+
+class CircuitOpenError(OllamaError):
+    """Raised without contacting Ollama while the circuit breaker is open."""
+
+
+class DeadlineExceeded(OllamaError):
+    """Raised when a request's deadline passes before Ollama replies."""
+
+
+class CircuitBreaker:
+    """Fails fast after repeated Ollama failures instead of waiting on a dead server.
+
+    After `failure_threshold` consecutive failures the breaker opens and rejects
+    requests for `reset_timeout` seconds. It then lets a single trial request through;
+    success closes it again, failure re-opens it. A trial that never reports back
+    (e.g. interrupted by Ctrl+C) is replaced by a new one after another
+    `reset_timeout` seconds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_timeout:
+                # Let exactly one trial request through; _opened_at now times the trial
+                self.state = self.HALF_OPEN
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class OllamaClient:
+    """Keep-alive HTTP client for the Ollama API.
+
+    Connections are pooled in a persistent requests.Session. Connection errors
+    (including connect timeouts), 5xx responses and read timeouts on GET requests
+    are retried a bounded number of times with jittered exponential backoff; a
+    generate request that times out reading is not sent again. A CircuitBreaker
+    stops calls while the server is down.
+    `requests` is imported and the session opened on the first request, so a client
+    that is never used costs nothing. `keep_alive` (e.g. "30m") asks Ollama to keep
+    the model loaded between requests, so prompts that share a prefix can reuse its
+    cached work instead of reloading the model.
+    """
+
+    def __init__(self, base_url: str, timeouts: Optional[Dict[str, Any]] = None,
+                 max_retries: int = 2, backoff: float = 0.25, pool_size: int = 10,
+                 breaker: Optional[CircuitBreaker] = None, keep_alive: Optional[str] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self._session = None
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def _request(self, method: str, endpoint: str, path: str, deadline: Optional[float] = None,
+                 **kwargs) -> "requests.Response":
+        """Send a request with retries; raises OllamaError if Ollama is unavailable.
+
+        `deadline` (a time.monotonic() value) caps the timeouts of every attempt,
+        so the request gives up once it passes.
+        """
+        import requests
+        if deadline is not None and deadline <= time.monotonic():
+            raise DeadlineExceeded(f"No time left to call {path}")
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Ollama circuit breaker is open; skipping request")
+
+        url = f"{self.base_url}{path}"
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Full jitter keeps concurrent callers from retrying in lockstep
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            timeout = self.timeouts[endpoint]
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+                timeout = (min(connect, left), min(read, left))
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                last_error = e
+                continue
+            except requests.exceptions.Timeout as e:
+                last_error = e
+                if method == "GET":
+                    continue
+                # The server is up but slow; asking again would only wait as long again
+                break
+            except requests.exceptions.RequestException as e:
+                # Not a transient network problem; retrying won't help
+                self.breaker.record_failure()
+                raise OllamaError(f"Ollama request to {path} failed: {e}") from e
+            if response.status_code >= 500:
+                last_error = OllamaError(f"Ollama API error: {response.status_code}")
+                continue
+            self.breaker.record_success()
+            if response.status_code != 200:
+                # The server is up but rejected the request; retrying won't help
+                raise OllamaError(f"Ollama API error: {response.status_code}")
+            return response
+
+        self.breaker.record_failure()
+        if deadline is not None and deadline <= time.monotonic():
+            raise DeadlineExceeded(f"Ollama request to {path} passed its deadline: {last_error}")
+        attempts = f"{attempt + 1} attempt{'s' if attempt else ''}"
+        raise OllamaError(f"Ollama request to {path} failed after {attempts}: {last_error}")
+
+    def _json(self, response: "requests.Response") -> Dict[str, Any]:
+        """Decode a JSON object reply; anything else (e.g. a proxy's error page) counts as a failure."""
+        try:
+            body = response.json()
+        except ValueError as e:
+            body = e
+        if not isinstance(body, dict):
+            self.breaker.record_failure()
+            raise OllamaError(f"Ollama sent an invalid reply from {response.url}")
+        return body
+
+    def _payload(self, model: str, prompt: str, options: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+        payload = {"model": model, "prompt": prompt, "stream": stream, "options": options or {}}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 deadline: Optional[float] = None) -> str:
+        """Run a non-streaming completion and return the response text; `deadline` works as in _request."""
+        response = self._request("POST", "generate", "/api/generate", deadline=deadline,
+                                 json=self._payload(model, prompt, options, stream=False))
+        return str(self._json(response).get("response", "")).strip()
+
+    def generate_stream(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                        cancel: Optional[threading.Event] = None) -> Iterator[str]:
+        """Run a streaming completion, yielding text chunks as Ollama produces them.
+
+        Setting `cancel`, or closing the generator, stops reading and closes the
+        response so Ollama stops generating for us.
+        """
+        import requests
+        response = self._request("POST", "generate", "/api/generate", stream=True,
+                                 json=self._payload(model, prompt, options, stream=True))
+        try:
+            for line in response.iter_lines():
+                if cancel is not None and cancel.is_set():
+                    return
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except ValueError:
+                    chunk = None
+                if not isinstance(chunk, dict):
+                    self.breaker.record_failure()
+                    raise OllamaError(f"Ollama sent an invalid stream line: {line[:80]!r}")
+                if "error" in chunk:
+                    raise OllamaError(f"Ollama API error: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
+        except requests.exceptions.RequestException as e:
+            raise OllamaError(f"Ollama stream interrupted: {e}")
+        finally:
+            response.close()
+
+    def preload(self, model: str):
+        """Load a model into memory without generating anything, so the next request doesn't wait for it."""
+        payload = {"model": model}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        self._request("POST", "generate", "/api/generate", json=payload)
+
+    def list_models(self) -> List[str]:
+        """Names of the models installed in Ollama."""
+        response = self._request("GET", "tags", "/api/tags")
+        try:
+            return [model["name"] for model in self._json(response).get("models", [])]
+        except (KeyError, TypeError) as e:
+            raise OllamaError(f"Ollama sent an invalid model list: {e}") from e
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -0,0 +1,142 @@
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
+# Keys of a post dict, in order; also the column order for CSV exports
+POST_FIELDS = ("date", "theme", "target_campus", "content", "hashtags", "full_post", "character_count",
+               "model_used", "creative_style", "seed", "listing_id")
+
+
+class Post(MutableMapping):
+    """One generated post, stored compactly.
+
+    Only the fields that vary are kept, in slots; `hashtags`, `full_post`,
+    `character_count` and `creative_style` are derived from them when read, so
+    they always match the content. Short repeated strings (date, theme, campus,
+    model, listing) are interned so posts share them. Other keys, such as a
+    "note", can be added like on a dict. A Post reads and compares like the post
+    dict it stands for; as_dict() gives that dict for JSON. Derived fields can't
+    be assigned; set `content` instead.
+    """
+
+    __slots__ = ("date", "theme", "target_campus", "content", "model_used", "seed", "listing_id", "_extra")
+
+    def __init__(self, date: str, theme: str, target_campus: str, content: str, model_used: str,
+                 seed: Optional[int] = None, listing_id: Optional[str] = None):
+        self.date = sys.intern(date)
+        self.theme = sys.intern(theme)
+        self.target_campus = sys.intern(target_campus)
+        self.content = content
+        self.model_used = sys.intern(model_used)
+        self.seed = seed
+        self.listing_id = sys.intern(listing_id) if listing_id is not None else None
+        self._extra: Optional[Dict[str, Any]] = None
+
+    # The full post is the content itself (no hashtags or creative styling)
+    @property
+    def hashtags(self) -> str:
+        return ""
+
+    @property
+    def full_post(self) -> str:
+        return self.content
+
+    @property
+    def character_count(self) -> int:
+        return len(self.content)
+
+    @property
+    def creative_style(self) -> str:
+        return "clean"
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in _STORED_FIELDS:
+            setattr(self, key, value)
+        elif key in _FIELD_SET:
+            raise KeyError(f"{key} is derived from the content and can't be set")
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in _FIELD_SET or self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from POST_FIELDS
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return len(POST_FIELDS) + (len(self._extra) if self._extra is not None else 0)
+
+    def __repr__(self) -> str:
+        return f"Post({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        post = {key: getattr(self, key) for key in POST_FIELDS}
+        if self._extra is not None:
+            post.update(self._extra)
+        return post
+
+
+_FIELD_SET = frozenset(POST_FIELDS)
+_STORED_FIELDS = frozenset(Post.__slots__) - {"_extra"}
+
+
+def as_dict(post: Dict[str, Any]) -> Dict[str, Any]:
+    """A plain dict for a post or post dict, e.g. for json.dumps."""
+    return post.to_dict() if isinstance(post, Post) else post
+
+
+def build_post(date: str, theme: str, campus: str, content: str, model_used: str,
+               seed: Optional[int] = None, listing_id: Optional[str] = None) -> Post:
+    """Build a post in the shape used by the CLI, the web UI and the save paths."""
+    return Post(date, theme, campus, content, model_used, seed, listing_id)
+
+
+class PostBatch:
+    """Columnar batch of generated posts.
+
+    Each column is a plain list indexed by post position, and identical contents
+    share one string object. Indexing or iterating yields Post records.
+    `seed` is the batch seed and `listing_id` the listing; both are recorded in
+    every post.
+    """
+
+    __slots__ = ("date", "themes", "campuses", "contents", "models", "seed", "listing_id")
+
+    def __init__(self, date: str, themes: List[str], campuses: List[str],
+                 contents: List[str], models: List[str], seed: Optional[int] = None,
+                 listing_id: Optional[str] = None):
+        self.date = date
+        self.themes = themes
+        self.campuses = campuses
+        self.contents = contents
+        self.models = models
+        self.seed = seed
+        self.listing_id = listing_id
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __getitem__(self, index: int) -> Post:
+        return build_post(self.date, self.themes[index], self.campuses[index],
+                          self.contents[index], self.models[index], self.seed, self.listing_id)
+
+    def __iter__(self) -> Iterator[Post]:
+        for theme, campus, content, model_used in zip(self.themes, self.campuses, self.contents, self.models):
+            yield build_post(self.date, theme, campus, content, model_used, self.seed, self.listing_id)
+
+    def to_dicts(self) -> List[Post]:
+        """Materialize the whole batch as a list of posts."""
+        return list(self)
@@ -0,0 +1,119 @@
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Shortest and longest LLM post accepted, in characters
+MIN_POST_CHARS = 80
+MAX_POST_CHARS = 1500
+
+# Emoji, pictographs, dingbats and the joiners and modifiers that build emoji sequences
+EMOJI_RE = re.compile(
+    "[\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF"
+    "\u200D\uFE0E\uFE0F\u20E3]+"
+)
+# A hashtag starts a word, so URL fragments and "#1" are left alone
+HASHTAG_RE = re.compile(r"(?<![\w/&#])#[^\W\d_]\w*")
+SPACE_RUN_RE = re.compile(r"[ \t]{2,}")
+TRAILING_SPACE_RE = re.compile(r"[ \t]+\n")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def clean_text(text: str) -> str:
+    """Text in the "clean" creative style: no emoji or hashtags, tidy whitespace."""
+    text = EMOJI_RE.sub("", text)
+    text = HASHTAG_RE.sub("", text)
+    text = SPACE_RUN_RE.sub(" ", text)
+    text = TRAILING_SPACE_RE.sub("\n", text)
+    return BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def clean_stream(tokens: Iterable[str]) -> Iterator[str]:
+    """Clean streamed text as it arrives.
+
+    Text is held back only until the next whitespace, so a hashtag or emoji
+    sequence split across tokens is still removed whole.
+    """
+    pending = ""
+    after_space = True
+    try:
+        for token in tokens:
+            pending += token
+            cut = max(pending.rfind(" "), pending.rfind("\n"))
+            if cut < 0:
+                continue
+            ready, pending = pending[:cut + 1], pending[cut + 1:]
+            ready = SPACE_RUN_RE.sub(" ", HASHTAG_RE.sub("", EMOJI_RE.sub("", ready)))
+            if after_space:
+                ready = ready.lstrip(" ")
+            if ready:
+                after_space = ready[-1] in " \n"
+                yield ready
+        if pending:
+            yield HASHTAG_RE.sub("", EMOJI_RE.sub("", pending))
+    finally:
+        close = getattr(tokens, "close", None)
+        if close is not None:
+            close()
+
+
+def _money_pattern(amount: str) -> str:
+    """A dollar amount, with or without its thousands separators ("$1,500" or "$1500")."""
+    digits = amount.lstrip("$").strip()
+    return r"\$\s?" + r",?".join(re.escape(part) for part in digits.split(",")) + r"(?!,?\d)"
+
+
+def _url_pattern(url: str) -> str:
+    """A URL, with or without its scheme or a trailing slash."""
+    bare = re.sub(r"^https?://", "", url.strip()).rstrip("/")
+    return r"(?:https?://)?" + re.escape(bare) + "/?"
+
+
+class PostValidator:
+    """Cleans and checks generated text against one listing.
+
+    The required facts are the rent, the total due at signing and the virtual
+    tour link. They are compiled into a single regex, so checking a candidate is
+    one scan of its text; thousands of candidates a second can be checked.
+    """
+
+    def __init__(self, details: Dict[str, Any], min_chars: int = MIN_POST_CHARS,
+                 max_chars: int = MAX_POST_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        facts = {
+            "rent": _money_pattern(details["pricing"]["rent"]),
+            "total_due_at_signing": _money_pattern(details["pricing"]["total_due_at_signing"]),
+            "virtual_tour": _url_pattern(details["contact"]["virtual_tour"]),
+        }
+        # One group per distinct pattern; facts with the same value share it
+        self._facts: Dict[str, List[str]] = {}
+        for fact, pattern in facts.items():
+            self._facts.setdefault(pattern, []).append(fact)
+        self._groups = {f"f{i}": names for i, names in enumerate(self._facts.values())}
+        self._facts_re = re.compile(
+            "|".join(f"(?P<f{i}>{pattern})" for i, pattern in enumerate(self._facts)), re.IGNORECASE
+        )
+        self.required = frozenset(facts)
+
+    def missing_facts(self, text: str) -> List[str]:
+        found = set()
+        for match in self._facts_re.finditer(text):
+            found.update(self._groups[match.lastgroup])
+            if len(found) == len(self.required):
+                return []
+        return sorted(self.required - found)
+
+    def problem(self, text: str) -> Optional[str]:
+        """Why cleaned text can't be posted, or None if it can."""
+        if len(text) < self.min_chars:
+            return "too_short"
+        if len(text) > self.max_chars:
+            return "too_long"
+        missing = self.missing_facts(text)
+        if missing:
+            return f"missing_{missing[0]}"
+        return None
+
+    def process(self, text: str) -> Tuple[str, Optional[str]]:
+        """Clean the text and check it; returns the cleaned text and its problem, if any."""
+        text = clean_text(text)
+        return text, self.problem(text)
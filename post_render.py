@@ -0,0 +1,172 @@
+import html
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# Rendered previews kept per renderer; a page of posts plus recent history fits easily
+RENDER_CACHE_SIZE = 1024
+
+RULE = "=" * 60
+THIN_RULE = "-" * 60
+FEED_RULE = "─" * 40
+
+
+@lru_cache(maxsize=256)
+def label(name: str) -> str:
+    """Display label for a snake_case name, e.g. beach_lifestyle -> Beach Lifestyle."""
+    return name.replace("_", " ").title()
+
+
+def text_html(text: str) -> str:
+    """Plain text as HTML: escaped, with line breaks kept."""
+    return html.escape(text).replace("\n", "<br>")
+
+
+# Renderers are memoized on the fields they show. Post strings are shared and
+# cache their hashes, so showing a post again costs one dict lookup, and a
+# post whose fields change is rendered afresh.
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _preview_html(date: str, content: str) -> str:
+    return f"""
+    <div class="post-preview">
+        <strong>🏠 Your Name • {html.escape(date)}</strong><br><br>
+    </div>
+    <div class="post-preview">
+        {text_html(content)}<br><br>
+        <em>👍 Like • 💬 Comment • 🔄 Share</em>
+    </div>
+    """
+
+
+def preview_html(post: Dict[str, Any]) -> str:
+    """Facebook-style HTML preview of a post."""
+    return _preview_html(post["date"], post["content"])
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _details_html(campus: str, theme: str, creative_style: str, model_used: str,
+                  character_count: int, seed: Any, generated_at: str) -> str:
+    escape = html.escape
+    return f"""
+    <div class="stats-card">
+        <span class="campus-badge">{escape(campus)}</span><br>
+        <span class="theme-badge">{escape(label(theme))}</span><br><br>
+        <strong>Style:</strong> {escape(label(creative_style))}<br>
+        <strong>Model:</strong> {escape(str(model_used))}<br>
+        <strong>Characters:</strong> {character_count}<br>
+        <strong>Seed:</strong> {escape(str(seed))}<br>
+        <strong>Generated:</strong> {escape(generated_at)}
+    </div>
+    """
+
+
+def details_html(post: Dict[str, Any], generated_at: str = "") -> str:
+    """HTML card with a post's campus, theme, style, model, length and seed."""
+    return _details_html(post["target_campus"], post["theme"], post["creative_style"], post["model_used"],
+                         post["character_count"], post.get("seed"), generated_at)
+
+
+def listing_header_html(details: Dict[str, Any]) -> str:
+    """Page subheading with the listing's address, layout and rent."""
+    header = (f"{details['address']} • {details['bedrooms']} bed / {details['bathrooms']} bath • "
+              f"{details['pricing']['rent']}/month")
+    return f'<p style="text-align: center; color: #666;">{html.escape(header)}</p>'
+
+
+def model_latency_html(stats: Dict[str, Dict[str, float]]) -> str:
+    """Recent p95 latency of each model that has served requests."""
+    return "".join(
+        f"<strong>{html.escape(model)} p95:</strong> {latency['p95']:.2f} s ({latency['count']} requests)<br>"
+        for model, latency in stats.items() if latency["count"]
+    )
+
+
+def agent_info_html(model_name: str, stats: Dict[str, Dict[str, float]], theme_count: int,
+                    template_count: int) -> str:
+    """HTML card with the agent's model, model latencies and template counts."""
+    return f"""
+    <div class="stats-card">
+        <strong>Model:</strong> {html.escape(model_name)}<br>
+        {model_latency_html(stats)}
+        <strong>Themes:</strong> {theme_count}<br>
+        <strong>Templates:</strong> {template_count}<br>
+        <strong>Style:</strong> Clean (No emojis/hashtags)
+    </div>
+    """
+
+
+def live_metrics_html(summary: Dict[str, Any]) -> str:
+    """HTML card with headline numbers from the agent's live metrics (see web_ui.metrics_summary)."""
+    escape = html.escape
+    posts_by_model = ", ".join(
+        f"{escape(model)} {count:.0f}" for model, count in sorted(summary["posts_by_model"].items())
+    )
+    hit_rate = summary["cache_hit_rate"]
+    latencies = "".join(
+        f"<strong>{escape(label(name))}:</strong> {mean_ms:.2f} ms avg<br>"
+        for name, mean_ms in sorted(summary["mean_ms"].items())
+    )
+    return f"""
+    <div class="stats-card">
+        <strong>Posts generated:</strong> {posts_by_model or 'none yet'}<br>
+        <strong>Posts saved:</strong> {summary["saved"]:.0f}<br>
+        <strong>LLM cache hit rate:</strong> {f"{hit_rate:.0%}" if hit_rate is not None else "n/a"}<br>
+        <strong>Ollama errors:</strong> {summary["ollama_errors"]:.0f}<br>
+        {latencies}
+    </div>
+    """
+
+
+def stream_html(text: str) -> str:
+    """HTML for the text of a post still being written; not cached, as it changes with every token."""
+    return f"""
+    <div class="post-preview">
+        {text_html(text)}
+    </div>
+    """
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def facebook_text(date: str, content: str) -> str:
+    """The post as it would appear in the Facebook feed, for the terminal."""
+    return "\n".join([
+        "",
+        "📱 HOW IT WOULD LOOK ON FACEBOOK:",
+        FEED_RULE,
+        f"🏠 Your Name • {date}",
+        FEED_RULE,
+        content,
+        FEED_RULE,
+        "👍 Like • 💬 Comment • 🔄 Share",
+        RULE,
+    ])
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _preview_text(date: str, campus: str, theme: str, model_used: str, creative_style: str,
+                  character_count: int, seed: Any, note: Optional[str], content: str) -> str:
+    lines = [
+        "",
+        RULE,
+        "📱 FACEBOOK POST PREVIEW",
+        RULE,
+        f"📅 Date: {date}",
+        f"🎯 Target Audience: {campus} students",
+        f"📌 Theme: {label(theme)}",
+        f"🤖 Generated by: {model_used}",
+        f"🎨 Creative Style: {label(creative_style)}",
+        f"📊 Character count: {character_count}",
+    ]
+    if seed is not None:
+        lines.append(f"🎲 Seed: {seed}")
+    if note is not None:
+        lines.append(f"⚠️  Note: {note}")
+    lines += ["", THIN_RULE, "📝 POST CONTENT:", THIN_RULE, content, THIN_RULE]
+    return "\n".join(lines) + "\n" + facebook_text(date, content)
+
+
+def preview_text(post: Dict[str, Any]) -> str:
+    """The full terminal preview of a post: its details, its text and the feed view."""
+    return _preview_text(post["date"], post["target_campus"], post["theme"], post.get("model_used", "unknown"),
+                         post.get("creative_style", "standard"), post["character_count"], post.get("seed"),
+                         post.get("note"), post["content"])
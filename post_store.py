@@ -0,0 +1,153 @@
+import bisect
+import json
+import os
+import threading
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Set
+
+from post_batch import as_dict
+
+
+class PostStore:
+    """Append-only JSONL store of generated posts.
+
+    Each line of the file is one post dict. In-memory indexes of byte offsets
+    by date, theme and campus are built from the file on first use and brought
+    up to date before every read or write, by scanning only the bytes added
+    since (e.g. by another process saving posts). Queries read just the
+    matching lines. A line that can't be decoded, such as one cut short by a
+    crash, is skipped, and appends always start on a fresh line.
+    """
+
+    def __init__(self, path: str = "posts.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._offsets: List[int] = []
+        self._dates: List[str] = []  # sorted distinct dates
+        self._by_date: Dict[str, List[int]] = {}
+        self._by_theme: Dict[str, Set[int]] = {}
+        self._by_campus: Dict[str, Set[int]] = {}
+        self._size = 0  # bytes of the file indexed so far
+
+    def _refresh(self):
+        """Index whatever has been appended to the file since it was last read."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self._size:
+            # The file was replaced or truncated; index it afresh
+            self._reset()
+        if size > self._size:
+            with open(self.path, "rb") as f:
+                self._scan(f)
+
+    def _scan(self, f: BinaryIO):
+        f.seek(self._size)
+        offset = self._size
+        for line in f:
+            if line.strip():
+                try:
+                    post = json.loads(line)
+                except ValueError:
+                    if not line.endswith(b"\n"):
+                        # Another writer may not have finished it; look again next time
+                        break
+                    # A write cut short (e.g. by a crash); the record is lost, the rest is fine
+                    print(f"Skipping unreadable record at byte {offset} of {self.path}")
+                else:
+                    self._index(post, offset)
+            offset += len(line)
+        self._size = offset
+
+    def _index(self, post: Dict[str, Any], offset: int):
+        record_id = len(self._offsets)
+        self._offsets.append(offset)
+        date = post.get("date", "")
+        if date not in self._by_date:
+            bisect.insort(self._dates, date)
+            self._by_date[date] = []
+        self._by_date[date].append(record_id)
+        self._by_theme.setdefault(post.get("theme"), set()).add(record_id)
+        self._by_campus.setdefault(post.get("target_campus"), set()).add(record_id)
+
+    def append(self, post: Dict[str, Any]) -> int:
+        """Store one post and return its record id."""
+        return self.extend([post])[0]
+
+    def extend(self, posts: Iterable[Dict[str, Any]]) -> List[int]:
+        """Store several posts with a single write; returns their record ids."""
+        posts = list(posts)
+        lines = [(json.dumps(as_dict(post), ensure_ascii=False) + "\n").encode("utf-8") for post in posts]
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                if f.seek(0, os.SEEK_END) < self._size:
+                    self._reset()
+                # Index anything another process appended since we last looked
+                self._scan(f)
+                offset = f.seek(0, os.SEEK_END)
+                if offset:
+                    # Don't run on from a line left unterminated by an interrupted write
+                    f.seek(offset - 1)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                        offset += 1
+                f.write(b"".join(lines))
+            first_id = len(self._offsets)
+            for post, line in zip(posts, lines):
+                self._index(post, offset)
+                offset += len(line)
+            self._size = offset
+        return list(range(first_id, first_id + len(posts)))
+
+    def query(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+              theme: Optional[str] = None, campus: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Posts dated within [start_date, end_date] (YYYY-MM-DD, inclusive) matching the filters.
+
+        Results are ordered by date, then by the order they were saved.
+        """
+        with self._lock:
+            self._refresh()
+            lo = bisect.bisect_left(self._dates, start_date) if start_date else 0
+            hi = bisect.bisect_right(self._dates, end_date) if end_date else len(self._dates)
+            filters = []
+            if theme is not None:
+                filters.append(self._by_theme.get(theme, set()))
+            if campus is not None:
+                filters.append(self._by_campus.get(campus, set()))
+
+            matches = []
+            for date in self._dates[lo:hi]:
+                matches.extend(record_id for record_id in self._by_date[date]
+                               if all(record_id in ids for ids in filters))
+                if limit is not None and len(matches) >= limit:
+                    del matches[limit:]
+                    break
+            offsets = [self._offsets[record_id] for record_id in matches]
+
+        return self._read(offsets)
+
+    def records(self, start: int = 0) -> List[Dict[str, Any]]:
+        """Posts with record ids from `start` on, in the order they were saved."""
+        with self._lock:
+            self._refresh()
+            offsets = self._offsets[start:]
+        return self._read(offsets)
+
+    def _read(self, offsets: List[int]) -> List[Dict[str, Any]]:
+        if not offsets:
+            return []
+        posts = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                posts.append(json.loads(f.readline()))
+        return posts
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._offsets)
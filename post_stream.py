@@ -0,0 +1,51 @@
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class PostStream:
+    """A post whose text is delivered incrementally as the model generates it.
+
+    Iterate to receive text chunks. Once iteration finishes, `post` holds the
+    completed post dict. Call `cancel()` to stop early (for example when the
+    user moves on); `post` then stays None.
+    """
+
+    def __init__(self, date: str, theme: str, campus: str, tokens: Iterator[str],
+                 finish: Callable[[str], Dict[str, Any]]):
+        self.date = date
+        self.theme = theme
+        self.target_campus = campus
+        self.post: Optional[Dict[str, Any]] = None
+        self.cancel_event = threading.Event()
+        self._tokens = tokens
+        self._finish = finish
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Stop generation and close the underlying Ollama response."""
+        self.cancel_event.set()
+        close = getattr(self._tokens, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # Still running in another thread; it stops at the next chunk
+                pass
+
+    def __iter__(self) -> Iterator[str]:
+        parts = []
+        try:
+            for token in self._tokens:
+                if self.cancelled:
+                    return
+                parts.append(token)
+                yield token
+        except GeneratorExit:
+            # The consumer stopped reading part way through
+            self.cancel()
+            raise
+        if not self.cancelled:
+            self.post = self._finish("".join(parts))
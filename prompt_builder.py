@@ -0,0 +1,77 @@
+import math
+from typing import Any, Dict, List
+
+from template_engine import room_summary
+
+# Prompt size limit in estimated tokens; small models answer faster with short prompts
+DEFAULT_PROMPT_BUDGET = 256
+# Room kept for the per-post part of the prompt (campus and theme)
+SUFFIX_RESERVE = 48
+
+# What each theme's post should play up
+THEME_FOCUS = {
+    "campus_proximity": "how close it is to campus",
+    "beach_lifestyle": "the beach and ocean views",
+    "student_community": "living among fellow students",
+    "affordability": "the price and what it includes",
+    "convenience": "everything within walking distance",
+    "move_in_ready": "rooms that are available right now",
+    "neighborhood_highlights": "the Isla Vista neighborhood",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+class PromptBuilder:
+    """Builds LLM prompts for listing posts within a token budget.
+
+    A prompt is a prefix describing the listing followed by a short suffix naming
+    the campus and theme. The prefix depends only on the listing, so every post
+    for a listing starts with the same text and Ollama can reuse the work it did
+    on that prefix while the model stays loaded (see OllamaClient.keep_alive).
+
+    The address, layout, open rooms, prices and tour link are always included.
+    Features and amenities are added in listing order, skipping repeats, for as
+    long as the prompt stays within `budget` estimated tokens.
+    """
+
+    def __init__(self, budget: int = DEFAULT_PROMPT_BUDGET):
+        self.budget = budget
+
+    def prefix(self, details: Dict[str, Any]) -> str:
+        pricing = details["pricing"]
+        lines = [
+            f"Write a short, {details['tone']} Facebook post advertising a room for rent in "
+            f"{details.get('location', 'Isla Vista, CA')}. Use plain text with no emojis or hashtags. "
+            "Mention the address, the rent, the total due at signing and the virtual tour link.",
+            f"Address: {details['address']} ({details['bedrooms']} bed / {details['bathrooms']} bath)",
+            f"Rooms: {room_summary(details.get('room_availability', {}))}",
+            f"Rent: {pricing['rent']}/month, {pricing['total_due_at_signing']} due at signing",
+            f"Virtual tour: {details['contact']['virtual_tour']}",
+        ]
+        used = sum(estimate_tokens(line) + 1 for line in lines)
+        highlights: List[str] = []
+        seen = set()
+        for item in list(details.get("features", [])) + list(details.get("amenities", [])):
+            if item.lower() in seen:
+                continue
+            cost = estimate_tokens(item) + 1
+            if used + cost > self.budget - SUFFIX_RESERVE:
+                break
+            seen.add(item.lower())
+            highlights.append(item)
+            used += cost
+        if highlights:
+            lines.append("Highlights: " + "; ".join(highlights))
+        return "\n".join(lines) + "\n"
+
+    def suffix(self, theme: str, campus: str) -> str:
+        focus = THEME_FOCUS.get(theme, theme.replace("_", " "))
+        return f"Audience: {campus} students\nTheme: {theme.replace('_', ' ')} - focus on {focus}\nPost:"
+
+    def build(self, details: Dict[str, Any], theme: str, campus: str) -> str:
+        return self.prefix(details) + self.suffix(theme, campus)
+
@@ -0,0 +1,83 @@
+import random
+from typing import Callable, List, Sequence, Tuple
+
+
+def deal_rounds(items: Sequence, n: int, rng: random.Random) -> List:
+    """Deal n items in shuffled rounds.
+
+    Each round uses every item once, so no item comes back until the others have
+    all been used. The same item never appears twice in a row, even where one
+    round ends and the next begins.
+    """
+    dealt = []
+    while len(dealt) < n:
+        round_items = list(items)
+        rng.shuffle(round_items)
+        if dealt and len(round_items) > 1 and round_items[0] == dealt[-1]:
+            j = rng.randrange(1, len(round_items))
+            round_items[0], round_items[j] = round_items[j], round_items[0]
+        dealt.extend(round_items)
+    del dealt[n:]
+    return dealt
+
+
+def spread_by_weight(choices: Sequence, weights: Sequence[float], n: int) -> List:
+    """n choices in proportion to their weights, interleaved as evenly as possible.
+
+    This is a smooth weighted round robin. Every prefix of the result is within one
+    post of the target ratio, so a week gets 5 UCSB and 2 SBCC posts at 70/30, and
+    longer horizons keep the ratio throughout.
+    """
+    total = sum(weights)
+    credit = [0.0] * len(choices)
+    picks = []
+    for _ in range(n):
+        for k, weight in enumerate(weights):
+            credit[k] += weight
+        best = max(range(len(choices)), key=credit.__getitem__)
+        credit[best] -= total
+        picks.append(choices[best])
+    return picks
+
+
+class PostScheduler:
+    """Plans the theme, campus and template of every post over a horizon in one pass.
+
+    - Themes are dealt in shuffled rounds, so each aligned run of len(themes) days
+      covers every theme and no theme is posted two days running.
+    - Campuses follow the campus weights exactly (see spread_by_weight).
+    - Within each theme, templates are dealt in rounds too, so a template is not
+      reused until the theme's other templates have been.
+
+    Planning only picks indexes; rendering is left to the caller.
+    """
+
+    def __init__(self, themes: List[str], campuses: List[str], campus_weights: List[float]):
+        self.themes = themes
+        self.campuses = campuses
+        self.campus_weights = campus_weights
+
+    def plan(self, n: int, rng: random.Random, variant_count: Callable[[str], int],
+             campus: str = None, campus_weights: List[float] = None) -> Tuple[List[str], List[str], List[int]]:
+        """Plan n consecutive posts.
+
+        `variant_count(theme)` is the number of templates available for a theme.
+        Returns parallel lists of themes, campuses and template indexes. A fixed
+        `campus` overrides the ratio, and `campus_weights` replaces the scheduler's
+        weights for this plan.
+        """
+        themes = deal_rounds(self.themes, n, rng)
+        if campus is not None:
+            campuses = [campus] * n
+        else:
+            campuses = spread_by_weight(self.campuses, campus_weights or self.campus_weights, n)
+
+        positions = {}
+        for i, theme in enumerate(themes):
+            positions.setdefault(theme, []).append(i)
+        variants = [0] * n
+        for theme, indices in positions.items():
+            picks = deal_rounds(range(variant_count(theme)), len(indices), rng)
+            for i, pick in zip(indices, picks):
+                variants[i] = pick
+        return themes, campuses, variants
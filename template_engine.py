@@ -0,0 +1,163 @@
+import copy
+from itertools import accumulate
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Placeholder left open at compile time; everything else is bound to the listing
+CAMPUS_FIELD = "campus"
+_CAMPUS_MARKER = "\x00"
+
+
+class ObservedDict(dict):
+    """Dict that calls `on_change` whenever it, or a nested dict, is modified in place."""
+
+    def __init__(self, data: Dict[str, Any], on_change: Callable[[], None]):
+        self._on_change = on_change
+        super().__init__((key, self._wrap(value)) for key, value in data.items())
+
+    def _wrap(self, value: Any) -> Any:
+        if isinstance(value, dict) and not isinstance(value, ObservedDict):
+            return ObservedDict(value, self._on_change)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self._wrap(value))
+        self._on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_change()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            super().__setitem__(key, self._wrap(value))
+        self._on_change()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._on_change()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_change()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._on_change()
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def room_summary(room_availability: Dict[str, str]) -> str:
+    """Describe the open rooms, e.g. "1 Triple room OR 1 Double room available immediately"."""
+    rooms = []
+    notes = []
+    for kind, availability in room_availability.items():
+        count, _, note = str(availability).partition(" ")
+        rooms.append(f"{count} {kind.replace('_', ' ').capitalize()}")
+        notes.append(note)
+    if not rooms:
+        return "Rooms available"
+    if len(set(notes)) == 1:
+        return f"{' OR '.join(rooms)} {notes[0]}".strip()
+    return " OR ".join(f"{room} {note}".strip() for room, note in zip(rooms, notes))
+
+
+def listing_fields(apartment_details: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten the apartment details into the fields used by the post templates."""
+    pricing = apartment_details["pricing"]
+    return {
+        "address": apartment_details["address"],
+        "bedrooms": apartment_details["bedrooms"],
+        "bathrooms": apartment_details["bathrooms"],
+        "rooms": room_summary(apartment_details.get("room_availability", {})),
+        "virtual_tour": apartment_details["contact"]["virtual_tour"],
+        "rent": pricing["rent"],
+        "deposit": pricing["deposit"],
+        "first_month": pricing["first_month"],
+        "last_month": pricing["last_month"],
+        "total_due_at_signing": pricing["total_due_at_signing"],
+    }
+
+
+class CompiledTemplate:
+    """A template with the listing fields already bound, leaving only the campus slots open."""
+
+    __slots__ = ("segments",)
+
+    def __init__(self, template: str, fields: Dict[str, Any]):
+        bound = template.format(**fields, **{CAMPUS_FIELD: _CAMPUS_MARKER})
+        self.segments: Tuple[str, ...] = tuple(bound.split(_CAMPUS_MARKER))
+
+    def render(self, campus: str) -> str:
+        """Fill the campus slots; the rest of the text is already static."""
+        return campus.join(self.segments)
+
+
+class TemplateEngine:
+    """Compiles the main and fallback templates once per listing and renders them cheaply."""
+
+    def __init__(self, post_templates: Dict[str, List[str]],
+                 fallback_templates: Dict[str, List[str]],
+                 apartment_details: Dict[str, Any]):
+        self.post_templates = post_templates
+        self.fallback_templates = fallback_templates
+        self.apartment_details = apartment_details
+        self._main: Optional[Dict[str, List[CompiledTemplate]]] = None
+        self._fallback: Optional[Dict[str, List[CompiledTemplate]]] = None
+        self._variants: Dict[str, Tuple[List[Tuple[str, CompiledTemplate]], List[float]]] = {}
+
+    def invalidate(self):
+        """Drop the compiled templates; they are rebuilt on the next render."""
+        self._main = None
+        self._fallback = None
+        self._variants = {}
+
+    def _compile(self):
+        fields = listing_fields(self.apartment_details)
+        self._main = {
+            theme: [CompiledTemplate(template, fields) for template in templates]
+            for theme, templates in self.post_templates.items()
+        }
+        self._fallback = {
+            theme: [CompiledTemplate(template, fields) for template in templates]
+            for theme, templates in self.fallback_templates.items()
+        }
+
+    def compiled_main(self, theme: str) -> List[CompiledTemplate]:
+        """Compiled main templates for a theme."""
+        if self._main is None:
+            self._compile()
+        return self._main[theme]
+
+    def compiled_fallback(self, theme: str) -> List[CompiledTemplate]:
+        """Compiled fallback templates for a theme, defaulting to campus proximity."""
+        if self._fallback is None:
+            self._compile()
+        return self._fallback.get(theme, self._fallback["campus_proximity"])
+
+    def variant_pool(self, theme: str) -> Tuple[List[Tuple[str, CompiledTemplate]], List[float]]:
+        """All (model_used, template) variants for a theme with cumulative draw weights.
+
+        Main and fallback templates each get half of the probability mass, matching
+        the coin flip in FacebookRentalAgent.generate_daily_post.
+        """
+        pool = self._variants.get(theme)
+        if pool is None:
+            main = self.compiled_main(theme)
+            fallback = self.compiled_fallback(theme)
+            variants = [("template", t) for t in main] + [("fallback", t) for t in fallback]
+            weights = [0.5 / len(main)] * len(main) + [0.5 / len(fallback)] * len(fallback)
+            cum_weights = list(accumulate(weights))
+            pool = self._variants[theme] = (variants, cum_weights)
+        return pool
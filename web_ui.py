@@ -1,8 +1,20 @@
 import streamlit as st
-import json
+import os
+import time
 from datetime import datetime, timedelta
 import random
-from facebook_rental_agent import FacebookRentalAgent
+from typing import Any, Dict
+from facebook_rental_agent import FacebookRentalAgent, load_env
+from job_queue import Job, JobQueue
+from metrics import InMemorySink, Metrics, metrics_from_env
+from ollama_client import OllamaClient
+from post_render import (agent_info_html, details_html, label, listing_header_html, live_metrics_html, preview_html,
+                         stream_html)
+
+MODEL_NAME = "tinyllama:latest"
+
+# Settings below come from the environment, so read .env before any of them
+load_env()
 
 # Page configuration
 st.set_page_config(
@@ -57,14 +69,142 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def load_agent(model_name: str, ollama_url: str) -> FacebookRentalAgent:
+    """Build the agent once per configuration; every rerun and browser session shares it."""
+    # Always keep in-memory metrics for the Statistics panel, plus any AGENT_METRICS sinks
+    metrics = metrics_from_env()
+    if metrics.memory() is None:
+        metrics = Metrics(metrics.sinks + [InMemorySink()])
+    ollama = OllamaClient(ollama_url, keep_alive=os.getenv('OLLAMA_KEEP_ALIVE', '30m'))
+    agent = FacebookRentalAgent(model_name=model_name, ollama=ollama, metrics=metrics)
+    # The UI stays up between posts; keep the routed model loaded so the next one starts fast
+    warm_interval = float(os.getenv('OLLAMA_WARM_INTERVAL', '600'))
+    if warm_interval > 0:
+        agent.router.keep_warm(warm_interval)
+    return agent
+
+@st.cache_resource(show_spinner=False)
+def load_agent_views(model_name: str, ollama_url: str) -> Dict[str, Any]:
+    """Display data derived from the agent, computed once per configuration."""
+    agent = load_agent(model_name, ollama_url)
+    theme_labels = {theme: label(theme) for theme in agent.post_themes}
+    return {
+        "theme_labels": theme_labels,
+        "themes_by_label": {label: theme for theme, label in theme_labels.items()},
+        "template_count": sum(len(templates) for templates in agent.post_templates.values()),
+        "listing_header_html": listing_header_html(agent.apartment_details),
+    }
+
+@st.cache_resource(show_spinner=False)
+def load_job_queue() -> JobQueue:
+    """One pool of background workers shared by every browser session (UI_WORKERS threads)."""
+    return JobQueue(workers=int(os.getenv('UI_WORKERS', '4')))
+
+def batch_job(agent, n, generation_mode, theme, campus, campus_weights):
+    """Job function generating a batch of posts, reporting each post as it finishes."""
+    def run(job):
+        if generation_mode == "LLM (stream as it types)":
+            for i in range(n):
+                if job.cancelled:
+                    return
+                stream = agent.stream_daily_post(theme=theme, campus=campus, campus_weights=campus_weights)
+                text = ""
+                for token in stream:
+                    if job.cancelled:
+                        stream.cancel()
+                        return
+                    text += token
+                    job.set_partial(i, text)
+                job.set_result(i, stream.post)
+        elif generation_mode == "LLM (all posts at once)":
+            # Requests go to Ollama concurrently instead of one after another
+            agent.generate_llm_posts(n, theme=theme, campus=campus, campus_weights=campus_weights,
+                                     on_result=job.set_result, cancel=job.cancel_event)
+        else:
+            for i, post in enumerate(agent.generate_posts(n, theme=theme, campus=campus,
+                                                          campus_weights=campus_weights)):
+                job.set_result(i, post)
+    return run
+
+def finished_job(jobs: JobQueue, state_key: str, label: str):
+    """The session's job under `state_key` once it has finished, else None.
+
+    While the job runs, its progress is shown and the page keeps polling. A
+    finished job is handed back once and then forgotten by the session.
+    """
+    job = jobs.get(st.session_state.get(state_key))
+    if job is None:
+        st.session_state.pop(state_key, None)
+        return None
+    if not job.finished:
+        st.progress(job.progress, text=f"{label}... {job.completed}/{job.total}")
+        st.session_state.polling = True
+        return None
+    del st.session_state[state_key]
+    if job.status == Job.FAILED:
+        st.error(f"❌ {label} failed: {job.error}")
+    return job
+
+def metrics_summary(sink: InMemorySink) -> Dict[str, Any]:
+    """Headline numbers from the agent's live metrics."""
+    by_model = {}
+    for labels, value in sink.counters("posts_generated").items():
+        model_used = dict(labels)["model_used"]
+        by_model[model_used] = by_model.get(model_used, 0) + value
+    cache = {dict(labels)["result"]: value for labels, value in sink.counters("llm_cache").items()}
+    lookups = cache.get("hit", 0) + cache.get("miss", 0)
+    timers = {}
+    for name, series in sink.snapshot()["timers"].items():
+        count = sum(entry["count"] for entry in series)
+        timers[name] = sum(entry["mean_ms"] * entry["count"] for entry in series) / count
+    return {
+        "posts_by_model": by_model,
+        "cache_hit_rate": cache.get("hit", 0) / lookups if lookups else None,
+        "ollama_errors": sum(sink.counters("ollama_errors").values()),
+        "saved": sum(sink.counters("posts_saved").values()),
+        "mean_ms": timers,
+    }
+
+def regenerate_job(agent, post, generation_mode):
+    """Job function replacing one post with a new one for the same theme and campus, using the batch's writer."""
+    def run(job):
+        if generation_mode == "LLM (stream as it types)":
+            stream = agent.stream_daily_post(theme=post['theme'], campus=post['target_campus'],
+                                             listing_id=post.get('listing_id'), use_cache=False)
+            text = ""
+            for token in stream:
+                if job.cancelled:
+                    stream.cancel()
+                    return
+                text += token
+                job.set_partial(0, text)
+            new_post = stream.post
+            new_post['date'] = post['date']
+        else:
+            new_post = agent.regenerate_post(post, use_llm=generation_mode != "Templates")
+        job.set_result(0, new_post)
+    return run
+
+def cancel_job(jobs: JobQueue, state_key: str):
+    """Cancel the session's job under `state_key`, if any, and forget it."""
+    job = jobs.get(st.session_state.pop(state_key, None))
+    if job is not None:
+        job.cancel()
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">🏠 Facebook Rental Agent</h1>', unsafe_allow_html=True)
     st.markdown('<h3 style="text-align: center; color: #666;">Isla Vista Apartment Marketing</h3>', unsafe_allow_html=True)
     
-    # Initialize agent
+    # Initialize agent (cached across reruns until the configuration changes)
     try:
-        agent = FacebookRentalAgent()
+        config = (MODEL_NAME, os.getenv('OLLAMA_URL', 'http://localhost:11434'))
+        agent = load_agent(*config)
+        jobs = load_job_queue()
+        views = load_agent_views(*config)
+        theme_labels = views["theme_labels"]
+        st.markdown(views["listing_header_html"], unsafe_allow_html=True)
         st.success("✅ Agent initialized successfully!")
     except Exception as e:
         st.error(f"❌ Error initializing agent: {e}")
@@ -83,12 +223,16 @@ def main():
         
         # Theme selection
         st.subheader("📌 Post Theme")
-        theme_options = ["Random"] + [theme.replace('_', ' ').title() for theme in agent.post_themes]
+        theme_options = ["Random"] + list(views["themes_by_label"])
         selected_theme = st.selectbox("Choose theme:", theme_options)
         
         # Number of posts
         st.subheader("📊 Generation")
         num_posts = st.slider("Number of posts to generate:", 1, 10, 3)
+        generation_mode = st.radio(
+            "Writer:",
+            ["Templates", "LLM (stream as it types)", "LLM (all posts at once)"]
+        )
         
         # Generate button
         if st.button("🚀 Generate Posts", type="primary"):
@@ -96,6 +240,7 @@ def main():
             st.session_state.campus_pref = campus_preference
             st.session_state.selected_theme = selected_theme
             st.session_state.num_posts = num_posts
+            st.session_state.generation_mode = generation_mode
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -103,80 +248,93 @@ def main():
     with col1:
         st.header("📱 Generated Posts")
         
-        # Move the generation logic here so posts appear in the left column
+        # Generation runs on the shared worker pool; the page polls until it is done
         if 'generate_posts' in st.session_state and st.session_state.generate_posts:
-            with st.spinner("Generating posts..."):
-                posts = []
-                
-                for i in range(st.session_state.num_posts):
-                    # Override campus selection if specified
-                    if st.session_state.campus_pref == "UCSB Only":
-                        # Force UCSB by temporarily modifying the agent
-                        original_weights = agent.generate_daily_post.__defaults__
-                        agent.generate_daily_post.__defaults__ = (["UCSB"],)
-                    elif st.session_state.campus_pref == "SBCC Only":
-                        agent.generate_daily_post.__defaults__ = (["SBCC"],)
-                    
-                    post = agent.generate_daily_post()
-                    
-                    # Override theme if specified
-                    if st.session_state.selected_theme != "Random":
-                        theme_name = st.session_state.selected_theme.lower().replace(' ', '_')
-                        post['theme'] = theme_name
-                    
-                    posts.append(post)
-                
+            # Override campus selection if specified
+            campus = None
+            campus_weights = None
+            if st.session_state.campus_pref == "UCSB Only":
+                campus = "UCSB"
+            elif st.session_state.campus_pref == "SBCC Only":
+                campus = "SBCC"
+            elif st.session_state.campus_pref == "Random":
+                campus_weights = {"UCSB": 0.5, "SBCC": 0.5}
+
+            # Override theme if specified
+            theme = None
+            if st.session_state.selected_theme != "Random":
+                theme = views["themes_by_label"][st.session_state.selected_theme]
+
+            # The new batch replaces the old one, so stop any work still running for it
+            cancel_job(jobs, "batch_job")
+            cancel_job(jobs, "regen_job")
+            job = jobs.submit(batch_job(agent, st.session_state.num_posts, st.session_state.generation_mode,
+                                        theme, campus, campus_weights),
+                              total=st.session_state.num_posts)
+            st.session_state.batch_job = job.id
+            st.session_state.generate_posts = False
+            # Template batches finish almost at once; don't make them wait for a poll
+            job.wait(0.2)
+        
+        if 'batch_job' in st.session_state:
+            running = jobs.get(st.session_state.batch_job)
+            if running is not None and not running.finished:
+                # Show posts as they arrive, including the text of streaming posts so far
+                for i, text in sorted(running.partial.items()):
+                    st.markdown(stream_html(text), unsafe_allow_html=True)
+                if st.button("✖️ Cancel generation"):
+                    running.cancel()
+            job = finished_job(jobs, "batch_job", "Generating posts")
+            if job is not None:
+                posts = [post for post in job.results if post is not None]
                 st.session_state.generated_posts = posts
-                st.session_state.generate_posts = False
+                st.session_state.generated_at = [datetime.now().strftime('%H:%M:%S')] * len(posts)
         
         # Display generated posts in the left column
         if 'generated_posts' in st.session_state:
-            for i, post in enumerate(st.session_state.generated_posts):
-                with st.expander(f"📝 Post {i+1} - {post['theme'].replace('_', ' ').title()}", expanded=True):
+            posts = st.session_state.generated_posts
+            # A Regenerate button queues a job for its slot; the new post replaces the old one when done
+            regenerating = st.session_state.get("regen_slot")
+            if 'regen_job' in st.session_state:
+                running = jobs.get(st.session_state.regen_job)
+                partial = running.partial.get(0) if running is not None and not running.finished else None
+                job = finished_job(jobs, "regen_job", f"Regenerating post {regenerating + 1}")
+                if job is not None and job.status == Job.DONE:
+                    posts[regenerating] = job.results[0]
+                    st.session_state.generated_at[regenerating] = datetime.now().strftime('%H:%M:%S')
+            else:
+                partial = None
+            for i, post in enumerate(posts):
+                with st.expander(f"📝 Post {i+1} - {theme_labels[post['theme']]}", expanded=True):
                     col_post, col_meta = st.columns([3, 1])
                     
                     with col_post:
                         st.markdown("### 📱 Facebook Preview")
-                        st.markdown(f"""
-                        <div class="post-preview">
-                            <strong>🏠 Your Name • {post['date']}</strong><br><br>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Display post content with preserved line breaks
-                        post_content_formatted = post['content'].replace('\n', '<br>')
-                        st.markdown(f"""
-                        <div class="post-preview">
-                            {post_content_formatted}<br><br>
-                            <em>👍 Like • 💬 Comment • 🔄 Share</em>
-                        </div>
-                        """, unsafe_allow_html=True)
+                        if i == regenerating and partial is not None:
+                            # The new post's text so far, while it streams
+                            st.markdown(stream_html(partial), unsafe_allow_html=True)
+                        else:
+                            st.markdown(preview_html(post), unsafe_allow_html=True)
                     
                     with col_meta:
                         st.markdown("### 📊 Post Details")
-                        st.markdown(f"""
-                        <div class="stats-card">
-                            <span class="campus-badge">{post['target_campus']}</span><br>
-                            <span class="theme-badge">{post['theme'].replace('_', ' ').title()}</span><br><br>
-                            <strong>Style:</strong> {post['creative_style'].replace('_', ' ').title()}<br>
-                            <strong>Model:</strong> {post['model_used']}<br>
-                            <strong>Characters:</strong> {post['character_count']}<br>
-                            <strong>Generated:</strong> {datetime.now().strftime('%H:%M:%S')}
-                        </div>
-                        """, unsafe_allow_html=True)
+                        st.markdown(details_html(post, st.session_state.generated_at[i]),
+                                    unsafe_allow_html=True)
                     
                     # Action buttons
                     col_actions = st.columns(3)
                     with col_actions[0]:
                         if st.button(f"💾 Save Post {i+1}", key=f"save_{i}"):
-                            filename = f"post_{i+1}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                            with open(filename, 'w') as f:
-                                json.dump(post, f, indent=2)
-                            st.success(f"✅ Saved as {filename}")
+                            agent.save_posts([post])
+                            st.success(f"✅ Saved to {agent.store.path}")
                     
                     with col_actions[1]:
                         if st.button(f"🔄 Regenerate {i+1}", key=f"regen_{i}"):
-                            st.session_state.regenerate_post = i
+                            cancel_job(jobs, "regen_job")
+                            st.session_state.regen_job = jobs.submit(
+                                regenerate_job(agent, post, st.session_state.generation_mode)
+                            ).id
+                            st.session_state.regen_slot = i
                             st.rerun()
                     
                     with col_actions[2]:
@@ -188,19 +346,16 @@ def main():
         
         # Agent stats
         st.markdown("### 🤖 Agent Info")
-        st.markdown(f"""
-        <div class="stats-card">
-            <strong>Model:</strong> {agent.model_name}<br>
-            <strong>Themes:</strong> {len(agent.post_themes)}<br>
-            <strong>Templates:</strong> {sum(len(templates) for templates in agent.post_templates.values())}<br>
-            <strong>Style:</strong> Clean (No emojis/hashtags)
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(agent_info_html(agent.model_name, agent.router.stats(), len(agent.post_themes),
+                                    views["template_count"]), unsafe_allow_html=True)
+        
+        # Live metrics, updated on every rerun
+        st.markdown("### ⏱️ Live Metrics")
+        st.markdown(live_metrics_html(metrics_summary(agent.metrics.memory())), unsafe_allow_html=True)
         
         # Theme breakdown
         st.markdown("### 🎨 Available Themes")
-        for theme in agent.post_themes:
-            theme_name = theme.replace('_', ' ').title()
+        for theme_name in theme_labels.values():
             st.markdown(f"• {theme_name}")
         
         # Campus targeting info
@@ -222,55 +377,49 @@ def main():
             st.rerun()
         
         if st.button("📅 Weekly Preview"):
-            weekly_posts = agent.schedule_weekly_posts()
-            st.session_state.weekly_posts = weekly_posts
+            def weekly(job):
+                job.set_result(0, agent.schedule_weekly_posts())
+            st.session_state.weekly_job = jobs.submit(weekly).id
             st.rerun()
         
         if st.button("📊 Theme Analysis"):
-            st.session_state.show_analysis = True
+            # Seeded, so every session asking for the same analysis shares one job
+            def analysis(job):
+                job.set_result(0, agent.sample_by_theme(3, seed=0))
+            st.session_state.analysis_job = jobs.submit(analysis, key=("analysis",) + config + (3, 0)).id
             st.rerun()
     
     # Quick post display
     if 'quick_post' in st.session_state:
         st.markdown("### 🎲 Random Post")
-        post = st.session_state.quick_post
-        st.markdown(f"""
-        <div class="post-preview">
-            <strong>🏠 Your Name • {post['date']}</strong><br><br>
-            {post['content']}<br><br>
-            {post['hashtags']}
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(preview_html(st.session_state.quick_post), unsafe_allow_html=True)
         del st.session_state.quick_post
     
     # Weekly posts display
-    if 'weekly_posts' in st.session_state:
-        st.markdown("### 📅 Weekly Posts Preview")
-        for i, post in enumerate(st.session_state.weekly_posts):
-            st.markdown(f"**Day {i+1} ({post['date']}):** {post['theme'].replace('_', ' ').title()} - {post['target_campus']}")
-        del st.session_state.weekly_posts
+    if 'weekly_job' in st.session_state:
+        job = finished_job(jobs, "weekly_job", "Planning the week")
+        if job is not None and job.status == Job.DONE:
+            st.markdown("### 📅 Weekly Posts Preview")
+            for i, post in enumerate(job.results[0]):
+                st.markdown(f"**Day {i+1} ({post['date']}):** {theme_labels[post['theme']]} - {post['target_campus']}")
     
     # Theme analysis
-    if 'show_analysis' in st.session_state:
-        st.markdown("### 📊 Theme Analysis")
-        
-        # Generate sample posts for each theme
-        theme_samples = {}
-        for theme in agent.post_themes:
-            theme_samples[theme] = []
-            for _ in range(3):
-                post = agent.generate_daily_post()
-                if post['theme'] == theme:
-                    theme_samples[theme].append(post)
-        
-        # Display analysis
-        for theme, posts in theme_samples.items():
-            with st.expander(f"📌 {theme.replace('_', ' ').title()} ({len(posts)} samples)"):
-                for j, post in enumerate(posts):
-                    st.markdown(f"**Sample {j+1}:** {post['target_campus']} - {post['creative_style'].replace('_', ' ').title()}")
-                    st.text(post['content'][:100] + "...")
-        
-        del st.session_state.show_analysis
+    if 'analysis_job' in st.session_state:
+        job = finished_job(jobs, "analysis_job", "Sampling every theme")
+        if job is not None and job.status == Job.DONE:
+            st.markdown("### 📊 Theme Analysis")
+            
+            # Display analysis
+            for theme, posts in job.results[0].items():
+                with st.expander(f"📌 {theme_labels[theme]} ({len(posts)} samples)"):
+                    for j, post in enumerate(posts):
+                        st.markdown(f"**Sample {j+1}:** {post['target_campus']} - {label(post['creative_style'])}")
+                        st.text(post['content'][:100] + "...")
+    
+    # Keep polling while this session has work on the queue
+    if st.session_state.pop("polling", False):
+        time.sleep(0.5)
+        st.rerun()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file